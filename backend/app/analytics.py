@@ -0,0 +1,220 @@
+"""Columnar portfolio math: FIFO positions, valuation and group-by allocation.
+
+Everything here works on whole NumPy/pandas columns instead of looping over
+orders or holdings in Python. Results match positions.compute_positions and
+the per-holding loops the endpoints used before.
+"""
+import math
+import numpy as np
+import pandas as pd
+from .market_data import QUOTE_COLUMNS
+
+POSITION_COLUMNS = ["quantity", "investment", "realized_profit", "avg_buy_price", "last_order_date"]
+
+
+def _segment_cumsum(values, starts, lengths):
+    """Cumulative sums restarting at each segment start (segments are contiguous)."""
+    total = np.cumsum(values)
+    return total - np.repeat(total[starts] - values[starts], lengths)
+
+
+def _replay(orders):
+    """Shared FIFO replay: per-order held quantities, grouped into one contiguous segment per symbol.
+
+    Held quantity is the running net quantity reflected at zero,
+    h_t = c_t - min(0, min c_s), which is exactly what ignoring oversells does.
+    """
+    # Stable-sort orders into one contiguous segment, still in replay order, per symbol
+    codes, symbols = pd.factorize(orders["symbol"])
+    by_symbol = np.argsort(codes, kind="stable")
+    codes = codes[by_symbol]
+    quantity = orders["quantity"].to_numpy(dtype=float)[by_symbol]
+    type_codes, types = pd.factorize(orders["type"])
+    type_codes = type_codes[by_symbol]
+    is_buy = type_codes == (types.get_loc("buy") if "buy" in types else -1)
+    is_sell = type_codes == (types.get_loc("sell") if "sell" in types else -1)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, len(codes)])
+
+    signed = np.where(is_buy, quantity, np.where(is_sell, -quantity, 0.0))
+    net = _segment_cumsum(signed, starts, lengths)
+    held = net - np.minimum(pd.Series(net).groupby(codes, sort=False).cummin().to_numpy(), 0)
+    held_before = np.r_[0.0, held[:-1]]
+    held_before[starts] = 0.0
+    return {
+        "codes": codes,
+        "symbols": symbols,
+        "by_symbol": by_symbol,
+        "quantity": quantity,
+        "price": orders["price"].to_numpy(dtype=float)[by_symbol],
+        "dates": orders["date"].to_numpy()[by_symbol],
+        "is_buy": is_buy,
+        "starts": starts,
+        "lengths": lengths,
+        "held": held,
+        "bought": np.where(is_buy, quantity, 0.0),
+        "sold": np.where(is_sell, held_before - held, 0.0),
+    }
+
+
+def fifo_positions(orders, with_lots=False):
+    """Per-symbol FIFO positions from an order frame in replay order (see order_queries.load_order_frame).
+
+    Returns a frame indexed by symbol (first-seen order) with quantity,
+    investment, realized_profit, avg_buy_price and last_order_date. With
+    `with_lots=True` also returns the open buy lots as a frame of
+    symbol, quantity, price, date (oldest first within each symbol).
+
+    Sells beyond the held quantity are ignored, like apply_order. Buys are
+    consumed in order, so a buy lot's open part is whatever of it lies beyond
+    the symbol's total effective sells on the cumulative-bought axis.
+    """
+    if len(orders) == 0:
+        positions = pd.DataFrame(columns=POSITION_COLUMNS, index=pd.Index([], name="symbol"))
+        lots = pd.DataFrame(columns=["symbol", "quantity", "price", "date"])
+        return (positions, lots) if with_lots else positions
+
+    r = _replay(orders)
+    starts, lengths, price, bought = r["starts"], r["lengths"], r["price"], r["bought"]
+    ends = starts + lengths - 1
+    final_held = r["held"][ends]
+    consumed = np.add.reduceat(bought, starts) - final_held
+    cum_bought = _segment_cumsum(bought, starts, lengths)
+    remaining = np.where(r["is_buy"], np.clip(cum_bought - np.repeat(consumed, lengths), 0, r["quantity"]), 0.0)
+
+    investment = np.add.reduceat(remaining * price, starts)
+    cost_of_sold = np.add.reduceat(bought * price, starts) - investment
+    realized = np.add.reduceat(r["sold"] * price, starts) - cost_of_sold
+
+    symbols = r["symbols"]
+    positions = pd.DataFrame({
+        "quantity": final_held,
+        "investment": investment,
+        "realized_profit": realized,
+        "avg_buy_price": np.divide(investment, final_held, out=np.zeros(len(symbols)), where=final_held != 0),
+        "last_order_date": r["dates"][ends],
+    }, index=pd.Index(symbols, name="symbol"))
+    if not with_lots:
+        return positions
+
+    open_lot = remaining > 0
+    lots = pd.DataFrame({
+        "symbol": np.asarray(symbols)[r["codes"][open_lot]],
+        "quantity": remaining[open_lot],
+        "price": price[open_lot],
+        "date": r["dates"][open_lot],
+    })
+    return positions, lots
+
+
+def holding_changes(orders):
+    """Effective change in held quantity and cash invested for each order, aligned with `orders`.
+
+    Oversold quantity is dropped as in fifo_positions, so cumulative sums of
+    `quantity` per symbol give the held quantity after every order, and of
+    `cash` (buy cost minus sell proceeds) the net capital invested.
+    """
+    if len(orders) == 0:
+        return pd.DataFrame({"quantity": [], "cash": []}, index=orders.index)
+    r = _replay(orders)
+    quantity = np.empty(len(orders))
+    cash = np.empty(len(orders))
+    quantity[r["by_symbol"]] = r["bought"] - r["sold"]
+    cash[r["by_symbol"]] = (r["bought"] - r["sold"]) * r["price"]
+    return pd.DataFrame({"quantity": quantity, "cash": cash}, index=orders.index)
+
+
+def holdings_frame(holdings):
+    """Open holdings from a positions dict (symbol -> position) as a frame indexed by symbol."""
+    open_holdings = {symbol: p for symbol, p in holdings.items() if p["quantity"] > 0}
+    return pd.DataFrame(
+        {
+            "quantity": [p["quantity"] for p in open_holdings.values()],
+            "avg_buy_price": [p["avg_buy_price"] for p in open_holdings.values()],
+        },
+        index=pd.Index(list(open_holdings), name="symbol", dtype=object),
+        dtype=float,
+    )
+
+
+# Up to this many holdings a plain loop beats the column operations: every pandas
+# operation has a fixed cost, so the vectorized version only pays off for a few
+# thousand holdings (see benchmarks/bench_analytics.py)
+VALUE_LOOP_MAX_HOLDINGS = 2000
+
+VALUED_COLUMNS = ["quantity", "avg_buy_price", "market_price", "open", "previous_close", "investment",
+                  "current_value", "unrealized_profit", "day_change_percent", "allocation_percent"]
+
+
+def value_holdings(holdings, quotes):
+    """Value a holdings frame at a quote table (from market_data.get_quotes_async).
+
+    Adds market_price, previous_close, open (NaN when unknown), investment,
+    current_value (0 without a price), unrealized_profit, day_change_percent
+    and allocation_percent.
+    """
+    if len(holdings) <= VALUE_LOOP_MAX_HOLDINGS:
+        return _value_holdings_loop(holdings, quotes)
+    frame = holdings.join(quotes.reindex(holdings.index)[QUOTE_COLUMNS].astype(float))
+    frame = frame.rename(columns={"price": "market_price"})
+    frame["investment"] = frame["quantity"] * frame["avg_buy_price"]
+    frame["current_value"] = frame["quantity"] * frame["market_price"].fillna(0)
+    frame["unrealized_profit"] = frame["current_value"] - frame["investment"]
+
+    # Day change percent, same as Yahoo's regularMarketChangePercent; the day's open is the fallback base
+    has_price = frame["market_price"].notna()
+    has_previous = has_price & frame["previous_close"].notna() & (frame["previous_close"] != 0)
+    has_open = has_price & frame["open"].notna() & (frame["open"] != 0)
+    from_previous = (frame["market_price"] - frame["previous_close"]) / frame["previous_close"] * 100
+    from_open = (frame["market_price"] - frame["open"]) / frame["open"] * 100
+    frame["day_change_percent"] = from_previous.where(has_previous, from_open.where(has_open, 0.0))
+
+    total = frame["current_value"].sum()
+    frame["allocation_percent"] = frame["current_value"] / total * 100 if total else 0.0
+    return frame
+
+
+def _value_holdings_loop(holdings, quotes):
+    """value_holdings for small frames: the same columns, computed per holding into one array."""
+    row_of = {symbol: i for i, symbol in enumerate(quotes.index.tolist())}
+    prices, opens, previous_closes = (quotes[column].to_numpy(dtype=float).tolist() for column in QUOTE_COLUMNS)
+    nan = float("nan")
+    rows = []
+    for symbol, quantity, avg_buy_price in zip(
+        holdings.index.tolist(), holdings["quantity"].tolist(), holdings["avg_buy_price"].tolist()
+    ):
+        i = row_of.get(symbol)
+        price, open_, previous_close = (nan, nan, nan) if i is None else (prices[i], opens[i], previous_closes[i])
+        investment = quantity * avg_buy_price
+        current_value = quantity * (0.0 if math.isnan(price) else price)
+        day_change = 0.0
+        if not math.isnan(price):
+            if not math.isnan(previous_close) and previous_close != 0:
+                day_change = (price - previous_close) / previous_close * 100
+            elif not math.isnan(open_) and open_ != 0:
+                day_change = (price - open_) / open_ * 100
+        rows.append([quantity, avg_buy_price, price, open_, previous_close,
+                     investment, current_value, current_value - investment, day_change])
+    total = sum(row[6] for row in rows)
+    for row in rows:
+        row.append(row[6] / total * 100 if total else 0.0)
+    return pd.DataFrame(np.array(rows, dtype=float).reshape(-1, len(VALUED_COLUMNS)), index=holdings.index, columns=VALUED_COLUMNS)
+
+
+def allocation(values, groups):
+    """{group: {"value", "percentage"}} of summed values per group, in first-seen group order."""
+    total = values.sum()
+    if not total > 0:
+        return {}
+    sums = values.groupby(groups, sort=False).sum()
+    return {
+        group: {"value": float(value), "percentage": float(value / total * 100)}
+        for group, value in sums.items()
+    }
+
+
+def records(frame, columns):
+    """frame rows as JSON-ready dicts (symbol included), with NaN turned into None."""
+    out = frame.reset_index()[["symbol", *columns]]
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict("records")
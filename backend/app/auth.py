@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from collections import OrderedDict
 from pydantic import BaseModel, EmailStr
-from .database import SessionLocal
+from .database import SessionLocal, AsyncSessionLocal, run_sync
 from .models import User
-from .config import JWT_SECRET_KEY, JWT_ALGORITHM
+from .password_hashing import hash_password_async, verify_password_async
+from .config import JWT_SECRET_KEY, JWT_ALGORITHM, USER_CACHE_TTL_SECONDS, USER_CACHE_SIZE
+import threading
+import time
 import uuid
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # Dependency to get DB session
@@ -23,6 +26,19 @@ def get_db():
     finally:
         db.close()
 
+# Async variant for async routes (call sync helpers through database.run_sync). Without an async
+# engine configured it yields a regular Session, so those routes still work on the sync engine.
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Pydantic Schemas
 class UserCreate(BaseModel):
     email: EmailStr
@@ -44,13 +60,6 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
-# Password hashing helpers
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 # JWT helpers
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=1)):
     to_encode = data.copy()
@@ -65,47 +74,105 @@ def decode_access_token(token: str):
         user_id: str = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except JWTError:
+        # A real UUID, so the lookup also works on databases without a native uuid type (e.g. SQLite)
+        return uuid.UUID(user_id)
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Authenticated users by id: user_id -> (expires_at, detached User)
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def get_cached_user(user_id):
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _user_cache[user_id]
+            return None
+        _user_cache.move_to_end(user_id)
+        return entry[1]
+
+def cache_user(user):
+    with _user_cache_lock:
+        _user_cache[user.id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+        _user_cache.move_to_end(user.id)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+def invalidate_user(user_id):
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+# Any flushed change to a user drops the cached copy
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
+
 # Dependency to get current user
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     user_id = decode_access_token(token)
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    user = get_cached_user(user_id)
+    if user is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        # Detached so the cached copy outlives this request's session
+        db.expunge(user)
+        cache_user(user)
     return user
 
-# Register route
-@router.post("/register", response_model=Token)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    # Check for existing email
-    if db.query(User).filter(User.email == user_in.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
+# Lighter dependency for routes that only need the id: token claims only, no database lookup
+def get_current_user_id(token: str = Depends(oauth2_scheme)) -> uuid.UUID:
+    return decode_access_token(token)
 
-    hashed_pw = hash_password(user_in.password)
+def _user_by_email(db: Session, email):
+    return db.query(User).filter(User.email == email).first()
 
+def _create_user(db: Session, email, hashed_password):
     user = User(
         id=uuid.uuid4(),
-        email=user_in.email,
-        hashed_password=hashed_pw,
+        email=email,
+        hashed_password=hashed_password,
         created_at=datetime.utcnow(),
     )
-
     db.add(user)
     db.commit()
     db.refresh(user)
+    return user
+
+def _set_password_hash(db: Session, user: User, hashed_password):
+    user.hashed_password = hashed_password
+    db.commit()
+
+# Register route
+@router.post("/register", response_model=Token)
+async def register(user_in: UserCreate, db=Depends(get_async_db)):
+    # Check for existing email
+    if await run_sync(db, _user_by_email, user_in.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # bcrypt runs in the hashing process pool, off the event loop and the threadpool
+    hashed_pw = await hash_password_async(user_in.password)
+    user = await run_sync(db, _create_user, user_in.email, hashed_pw)
 
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
 # Login route
 @router.post("/login", response_model=Token)
-def login(user_in: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if not user or not verify_password(user_in.password, user.hashed_password):
+async def login(user_in: UserLogin, db=Depends(get_async_db)):
+    user = await run_sync(db, _user_by_email, user_in.email)
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+    valid, new_hash = await verify_password_async(user_in.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    # Stored with an outdated cost (BCRYPT_ROUNDS changed): upgrade it now that we have the password
+    if new_hash:
+        await run_sync(db, _set_password_hash, user, new_hash)
     token = create_access_token({"sub": str(user.id)})
     return {"access_token": token, "token_type": "bearer"}
 
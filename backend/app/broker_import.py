@@ -1,15 +1,35 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from sqlalchemy import insert, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
-from .auth import get_current_user, get_db
-from .models import Order
-import csv
+from .auth import get_current_user_id, get_db
+from .database import SessionLocal
+from .models import Order, ImportJob
+from .config import IMPORT_CHUNK_SIZE, IMPORT_WORKERS, IMPORT_MAX_ERRORS, IMPORT_HEARTBEAT_SECONDS, IMPORT_STALE_SECONDS
+from . import snapshots
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
-import io
 
 router = APIRouter()
 
+# Imports run off the request path; job state lives in the import_jobs table
+import_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+# Owner recorded on the jobs this process runs; see heartbeat_jobs
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+UNFINISHED = ["queued", "running"]
+
+_heartbeat_task = None
+
 # Keyword mapping for schema normalization
 KEYWORDS = {
     "symbol": ["symbol", "stock", "security", "ticker"],
@@ -22,10 +42,15 @@ KEYWORDS = {
 NORMALIZED_COLS = ["symbol", "type", "quantity", "price", "execution_time"]
 
 
-def detect_and_normalize_header(df):
+def find_header(df):
+    """Locate the header row in the first rows of a raw sheet.
+
+    Returns (row_index, normalized column names) so later chunks of the
+    same file can be normalized without searching again.
+    """
     # Scan first 10 rows for header
     for i in range(min(10, len(df))):
-        row = df.iloc[i].astype(str).str.strip().tolist()
+        row = df.iloc[i].fillna("").astype(str).str.strip().tolist()
         lower_row = [cell.lower() for cell in row]
         col_map = {}
         # Only allow exact match for 'Symbol'
@@ -47,105 +72,352 @@ def detect_and_normalize_header(df):
                     col_map[idx] = norm
         # If we found at least 3 required columns, treat this as header
         if len(col_map) >= 3 and "symbol" in col_map.values() and "type" in col_map.values():
-            # Normalize columns
-            norm_cols = [col_map.get(j, None) for j in range(len(row))]
-            df = df.iloc[i+1:].reset_index(drop=True)
-            df.columns = norm_cols
-            # Drop columns that are not mapped
-            df = df[[c for c in NORMALIZED_COLS if c in df.columns]]
-            return df
+            return i, [col_map.get(j, None) for j in range(len(row))]
     raise HTTPException(status_code=400, detail="Could not detect header row with required columns (exact 'Symbol' column required).")
 
-@router.post("/import")
-def import_csv(file: UploadFile = File(...), db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    filename = file.filename.lower()
+
+def normalize_columns(df, norm_cols):
+    df = df.copy()
+    df.columns = norm_cols[:len(df.columns)] + [None] * (len(df.columns) - len(norm_cols))
+    # Drop columns that are not mapped (first one wins if two map to the same field)
+    df = df.loc[:, ~df.columns.duplicated()]
+    return df[[c for c in NORMALIZED_COLS if c in df.columns]]
+
+
+def read_chunks(file, filename):
+    """Yield raw (header=None) frames of at most IMPORT_CHUNK_SIZE rows from an upload."""
     if filename.endswith('.csv'):
-        content = file.file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')), header=None)
+        # Stream straight from the spooled upload instead of reading it into memory
+        yield from pd.read_csv(file, header=None, dtype=str, encoding='utf-8', chunksize=IMPORT_CHUNK_SIZE)
     elif filename.endswith('.xlsx'):
-        content = file.file.read()
-        df = pd.read_excel(io.BytesIO(content), header=None)
+        # XLSX can't be parsed incrementally; slice it so inserts are still batched
+        df = pd.read_excel(file, header=None, dtype=str)
+        for start in range(0, len(df), IMPORT_CHUNK_SIZE):
+            yield df.iloc[start:start + IMPORT_CHUNK_SIZE]
     else:
         raise HTTPException(status_code=400, detail="Only CSV and XLSX files are supported.")
 
-    # Detect and normalize header
-    df = detect_and_normalize_header(df)
 
-    processed = 0
-    imported = 0
-    skipped = 0
+def iter_normalized_chunks(file, filename):
+    """Yield (first_row_number, normalized frame) pairs, detecting the header from the first chunk."""
+    norm_cols = None
+    row_offset = 0
+    for chunk in read_chunks(file, filename):
+        chunk = chunk.reset_index(drop=True)
+        if norm_cols is None:
+            header_idx, norm_cols = find_header(chunk)
+            chunk = chunk.iloc[header_idx+1:].reset_index(drop=True)
+        yield row_offset, normalize_columns(chunk, norm_cols)
+        row_offset += len(chunk)
+
+
+def _column(df, name):
+    if name in df.columns:
+        return df[name]
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _parse_execution_time(raw):
+    text = raw.fillna("").astype(str).str.strip()
+    blank = text == ""
+    # Fast path: one format inferred for the whole column; retry leftovers per element
+    parsed = pd.to_datetime(text.where(~blank), errors='coerce', dayfirst=True)
+    retry = parsed.isna() & ~blank
+    if retry.any():
+        parsed[retry] = pd.to_datetime(text[retry], errors='coerce', dayfirst=True, format='mixed')
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_localize(None)
+    # An all-blank column parses as datetime64[s], which can't hold now()'s microseconds
+    parsed = parsed.astype("datetime64[ns]")
+    parsed[blank] = pd.Timestamp(datetime.now())
+    return parsed, text
+
+
+def process_chunk(df, row_offset, user_id, seen):
+    """Validate and convert one normalized chunk with column operations.
+
+    Returns (records ready for a bulk insert, errors). Each invalid row gets
+    the first error that applies, in the same order the checks always ran.
+    """
+    symbol = _column(df, "symbol").fillna("").astype(str).str.strip()
+    type_ = _column(df, "type").fillna("").astype(str).str.strip().str.lower()
+    quantity = pd.to_numeric(_column(df, "quantity"), errors='coerce')
+    total_price = pd.to_numeric(_column(df, "price"), errors='coerce')
+    date, raw_time = _parse_execution_time(_column(df, "execution_time"))
+
+    checks = [
+        (symbol == "", lambda i: "Missing symbol"),
+        (~type_.isin(["buy", "sell"]), lambda i: "Invalid or missing type (must be 'buy' or 'sell')"),
+        (quantity.isna(), lambda i: "Invalid quantity"),
+        (total_price.isna(), lambda i: "Invalid price"),
+        (quantity == 0, lambda i: "Division error: price/quantity"),
+        (date.isna(), lambda i: f"Invalid execution_time/date format: {raw_time[i]}"),
+    ]
+    failed = pd.Series(False, index=df.index)
     errors = []
+    for mask, message in checks:
+        new_failures = mask & ~failed
+        for i in new_failures[new_failures].index:
+            errors.append({"row": row_offset + i + 2, "error": message(i)})
+        failed |= new_failures
+    errors.sort(key=lambda e: e["row"])
 
-    for idx, row in df.iterrows():
-        processed += 1
-        symbol = str(row.get("symbol", "")).strip()
-        if symbol:
-            symbol = symbol + ".NS"
-        type_ = str(row.get("type", "")).strip().lower()
-        quantity = row.get("quantity", "")
-        price = row.get("price", "")
-        exec_time = row.get("execution_time", "")
-
-        # Validation
-        if not symbol:
-            skipped += 1
-            errors.append({"row": idx+2, "error": "Missing symbol"})
-            continue
-        if type_ not in ("buy", "sell"):
-            skipped += 1
-            errors.append({"row": idx+2, "error": "Invalid or missing type (must be 'buy' or 'sell')"})
-            continue
-        try:
-            quantity = float(quantity)
-        except Exception:
-            skipped += 1
-            errors.append({"row": idx+2, "error": "Invalid quantity"})
-            continue
-        try:
-            price = float(price)
-        except Exception:
-            skipped += 1
-            errors.append({"row": idx+2, "error": "Invalid price"})
-            continue
-        # Divide price by quantity
+    ok = ~failed
+    valid = pd.DataFrame({
+        "symbol": symbol[ok] + ".NS",
+        "type": type_[ok],
+        "quantity": quantity[ok].astype(float),
+        # Broker exports carry the total trade value; store the per-share price
+        "price": (total_price[ok] / quantity[ok]).astype(float),
+        "date": date[ok],
+    })
+    # Rows without an execution time are stamped with now() and can't be told apart from a
+    # later, genuinely new trade: they get no fingerprint, so they are always imported
+    timed = raw_time[ok] != ""
+    fingerprints = pd.Series(None, index=valid.index, dtype=object)
+    fingerprints[timed] = trade_fingerprints(
+        valid[timed], date[ok][timed].dt.strftime("%Y-%m-%dT%H:%M:%S.%f"), user_id, seen
+    )
+    valid["fingerprint"] = fingerprints
+    records = [
+        {"id": uuid.uuid4(), "user_id": user_id, **row}
+        for row in valid.to_dict("records")
+    ]
+    return records, errors
+
+
+def trade_fingerprints(trades, time_key, user_id, seen):
+    """Deterministic id per imported trade: user, symbol, side, quantity, price and execution time.
+
+    Identical fills within one upload are told apart by their occurrence
+    number, so re-importing the same file yields the same fingerprints while
+    genuine repeated fills in it are all kept. `seen` carries occurrence
+    counts across chunks of the same upload.
+    """
+    if trades.empty:
+        return []
+    keys = (
+        str(user_id) + "|" + trades["symbol"] + "|" + trades["type"]
+        + "|" + trades["quantity"].map(repr) + "|" + trades["price"].map(repr)
+        + "|" + time_key
+    )
+    occurrence = keys.groupby(keys).cumcount() + keys.map(seen).fillna(0).astype(int)
+    for key, count in keys.value_counts().items():
+        seen[key] = seen.get(key, 0) + count
+    return [
+        hashlib.sha256(f"{key}|{n}".encode("utf-8")).hexdigest()
+        for key, n in zip(keys, occurrence)
+    ]
+
+
+def insert_new_orders(db: Session, records):
+    """Bulk insert, skipping rows whose (user_id, fingerprint) already exists. Rows without a fingerprint are always inserted.
+
+    Returns the symbols of the rows actually inserted.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = pg_insert(Order.__table__)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(Order.__table__)
+    else:
+        existing = {
+            f for (f,) in db.query(Order.fingerprint).filter(
+                Order.user_id == records[0]["user_id"],
+                Order.fingerprint.in_([r["fingerprint"] for r in records if r["fingerprint"] is not None]),
+            )
+        }
+        records = [r for r in records if r["fingerprint"] is None or r["fingerprint"] not in existing]
+        if records:
+            db.execute(insert(Order), records)
+        return [r["symbol"] for r in records]
+    stmt = stmt.on_conflict_do_nothing(index_elements=["user_id", "fingerprint"]).returning(Order.__table__.c.symbol)
+    return [symbol for (symbol,) in db.execute(stmt, records)]
+
+
+def import_orders(db: Session, user_id, file, filename, on_progress=None):
+    """Parse, validate and insert every row of an upload. Returns the final counts.
+
+    `on_progress(counts)` is called after each chunk is inserted. Only the
+    first IMPORT_MAX_ERRORS invalid rows are listed in counts["errors"].
+    """
+    counts = {"processed": 0, "imported": 0, "skipped": 0, "duplicates": 0, "errors": []}
+    imported_symbols = set()
+    seen = {}
+
+    for row_offset, df in iter_normalized_chunks(file, filename):
+        records, chunk_errors = process_chunk(df, row_offset, user_id, seen)
+        counts["processed"] += len(df)
+        counts["skipped"] += len(chunk_errors)
+        counts["errors"].extend(chunk_errors[:max(IMPORT_MAX_ERRORS - len(counts["errors"]), 0)])
+        if records:
+            # One executemany per chunk; trades imported before are skipped by the unique fingerprint
+            inserted = insert_new_orders(db, records)
+            counts["imported"] += len(inserted)
+            counts["duplicates"] += len(records) - len(inserted)
+            imported_symbols.update(inserted)
+        if on_progress is not None:
+            on_progress(counts)
+
+    snapshots.rebuild_symbols(db, user_id, imported_symbols)
+    db.commit()
+    return counts
+
+
+def run_import_job(job_id, path, filename):
+    """Worker entry point: import a saved upload and record progress on its ImportJob row."""
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        job.status = "running"
+        job.owner = WORKER_ID
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+        def on_progress(counts):
+            job.processed = counts["processed"]
+            job.imported = counts["imported"]
+            job.skipped = counts["skipped"]
+            job.duplicates = counts["duplicates"]
+            # The error list only grows (up to IMPORT_MAX_ERRORS); rewrite it only when it did
+            if len(counts["errors"]) != len(job.errors):
+                job.errors = list(counts["errors"])
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+
+        with open(path, "rb") as f:
+            counts = import_orders(db, job.user_id, f, filename, on_progress)
+        on_progress(counts)
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
         try:
-            price = price / quantity
-        except Exception:
-            skipped += 1
-            errors.append({"row": idx+2, "error": "Division error: price/quantity"})
-            continue
-        # Robust date/time parsing
+            _mark_failed(db, job_id, e.detail if isinstance(e, HTTPException) else str(e))
+        except Exception as inner:
+            print(f"Error recording failure of import job {job_id}: {inner}")
+    finally:
+        db.close()
+        os.remove(path)
+
+
+def _mark_failed(db: Session, job_id, detail, *conditions):
+    """Fail an unfinished job (if `conditions` still hold on its row) and return whether it did."""
+    claimed = db.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.status.in_(UNFINISHED), *conditions)
+        .values(status="failed", detail=detail, finished_at=datetime.utcnow())
+    ).rowcount
+    if not claimed:
+        db.rollback()
+        return False
+    user_id = db.get(ImportJob, job_id).user_id
+    # Chunks committed before the failure stay imported; keep their symbols' snapshots right
+    symbols = [s for (s,) in db.query(Order.symbol).filter(Order.user_id == user_id).distinct()]
+    snapshots.rebuild_symbols(db, user_id, symbols)
+    db.commit()
+    return True
+
+
+def fail_interrupted_jobs():
+    """Mark unfinished jobs whose owner stopped heartbeating as failed, and return how many.
+
+    Their worker thread died with that process, so nothing would ever finish
+    them. Jobs of live processes, this one or another app server, keep a
+    fresh heartbeat and are left alone; rows from before heartbeats count as stale.
+    """
+    stale = or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS))
+    db = SessionLocal()
+    try:
+        candidates = [job_id for (job_id,) in db.query(ImportJob.id).filter(ImportJob.status.in_(UNFINISHED), stale)]
+        db.rollback()
+        # Re-checked per job, so a heartbeat that lands in between keeps its job
+        return sum(_mark_failed(db, job_id, "Interrupted by a server restart; upload the file again", stale) for job_id in candidates)
+    finally:
+        db.close()
+
+
+def heartbeat_jobs():
+    """Refresh the heartbeat on this process's unfinished jobs, then fail other processes' abandoned ones."""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(ImportJob)
+            .where(ImportJob.owner == WORKER_ID, ImportJob.status.in_(UNFINISHED))
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        db.close()
+    return fail_interrupted_jobs()
+
+
+async def run_job_heartbeat():
+    while True:
         try:
-            if exec_time:
-                # Try parsing with pandas, dayfirst=True, errors='raise'
-                date_obj = pd.to_datetime(str(exec_time).strip(), errors='raise', dayfirst=True, infer_datetime_format=True)
-                # If date_obj is a pandas Timestamp, convert to python datetime
-                if hasattr(date_obj, 'to_pydatetime'):
-                    date_obj = date_obj.to_pydatetime()
-            else:
-                date_obj = datetime.now()
+            await run_in_threadpool(heartbeat_jobs)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            skipped += 1
-            errors.append({"row": idx+2, "error": f"Invalid execution_time/date format: {exec_time} ({e})"})
-            continue
-
-        # Save to DB
-        order = Order(
-            id=uuid.uuid4(),
-            user_id=current_user.id,
-            symbol=symbol,
-            quantity=quantity,
-            price=price,
-            date=date_obj,
-            type=type_,
-        )
-        db.add(order)
-        imported += 1
-    db.commit()
+            print(f"Error sweeping interrupted import jobs: {e}")
+        await asyncio.sleep(IMPORT_HEARTBEAT_SECONDS)
 
+
+def start_job_heartbeat():
+    global _heartbeat_task
+    if _heartbeat_task is None:
+        _heartbeat_task = asyncio.get_running_loop().create_task(run_job_heartbeat())
+
+
+async def stop_job_heartbeat():
+    global _heartbeat_task
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        try:
+            await _heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        _heartbeat_task = None
+
+
+def job_status(job: ImportJob):
     return {
-        "processed": processed,
-        "imported": imported,
-        "skipped": skipped,
-        "errors": errors
-    } 
\ No newline at end of file
+        "job_id": str(job.id),
+        "filename": job.filename,
+        "status": job.status,
+        "processed": job.processed,
+        "imported": job.imported,
+        "skipped": job.skipped,
+        "duplicates": job.duplicates,
+        "errors": job.errors,
+        "detail": job.detail,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+    }
+
+
+@router.post("/import", status_code=202)
+def import_csv(file: UploadFile = File(...), db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    """Queue an import and return its job id; poll /import/jobs/{job_id} for progress."""
+    filename = file.filename.lower()
+    if not filename.endswith(('.csv', '.xlsx')):
+        raise HTTPException(status_code=400, detail="Only CSV and XLSX files are supported.")
+
+    # Hand the worker a file of its own; the upload is closed when this request ends
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
+        shutil.copyfileobj(file.file, tmp)
+
+    job = ImportJob(id=uuid.uuid4(), user_id=user_id, filename=file.filename, status="queued", owner=WORKER_ID, heartbeat_at=datetime.utcnow())
+    db.add(job)
+    db.commit()
+    import_executor.submit(run_import_job, job.id, tmp.name, filename)
+    return job_status(job)
+
+
+@router.get("/import/jobs/{job_id}")
+def get_import_job(job_id: uuid.UUID, db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    job = db.query(ImportJob).filter(ImportJob.id == job_id, ImportJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job_status(job)
@@ -1,5 +1,93 @@
 import os
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
+
+# Connection pool (ignored for SQLite). Recycle below the server/proxy idle timeout; pre-ping drops dead connections.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional async engine for the async routes, opt-in: the same database through an async driver, e.g.
+# postgresql+asyncpg://... (spell libpq's sslmode as ssl) or sqlite+aiosqlite:///... Unset or "off" keeps
+# every route on the sync engine and the threadpool.
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL")
+if ASYNC_DATABASE_URL in ("", "off"):
+    ASYNC_DATABASE_URL = None
+
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 JWT_ALGORITHM = "HS256" 
+
+# Authenticated users are cached in-process for this long, keyed by id
+USER_CACHE_TTL_SECONDS = int(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "4096"))
+
+# Password hashing: bcrypt cost factor (existing hashes are upgraded on login when it changes), worker processes,
+# and hashes queued or running before /register and /login answer 503
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+# Market data quote cache
+QUOTE_TTL_SECONDS = int(os.environ.get("QUOTE_TTL_SECONDS", "60"))
+QUOTE_CACHE_SIZE = int(os.environ.get("QUOTE_CACHE_SIZE", "2048"))
+QUOTE_BATCH_SIZE = int(os.environ.get("QUOTE_BATCH_SIZE", "50"))
+
+# Instrument reference data (sector, market cap) is refreshed at most this often
+REFERENCE_REFRESH_SECONDS = int(os.environ.get("REFERENCE_REFRESH_SECONDS", "86400"))
+# Failed lookups (unknown or delisted symbols) are not retried for this long
+REFERENCE_FAILURE_TTL_SECONDS = int(os.environ.get("REFERENCE_FAILURE_TTL_SECONDS", "900"))
+
+# Market data source: "yfinance" (live), or "fixture" to read MARKET_DATA_FIXTURE (a SQLite file, see
+# providers.write_fixture) for offline benchmarks, load tests and development
+MARKET_DATA_PROVIDER = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+MARKET_DATA_FIXTURE = os.environ.get("MARKET_DATA_FIXTURE", "market_data_fixture.sqlite3")
+
+# Async market data client. MARKET_DATA_CONCURRENCY bounds both the concurrent chart API requests
+# and the threads running multi-symbol downloads
+MARKET_DATA_CONCURRENCY = int(os.environ.get("MARKET_DATA_CONCURRENCY", "8"))
+MARKET_DATA_MAX_CONNECTIONS = int(os.environ.get("MARKET_DATA_MAX_CONNECTIONS", "20"))
+MARKET_DATA_TIMEOUT_SECONDS = float(os.environ.get("MARKET_DATA_TIMEOUT_SECONDS", "10"))
+
+# LLM (Groq, OpenAI-compatible). Point GROQ_BASE_URL at a local fake server for testing.
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama3-70b-8192")
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", "1024"))
+
+# GET /orders: default and largest page size, and rows fetched per round trip for the NDJSON export
+ORDERS_PAGE_SIZE = int(os.environ.get("ORDERS_PAGE_SIZE", "500"))
+ORDERS_MAX_PAGE_SIZE = int(os.environ.get("ORDERS_MAX_PAGE_SIZE", "5000"))
+ORDERS_EXPORT_BATCH_SIZE = int(os.environ.get("ORDERS_EXPORT_BATCH_SIZE", "1000"))
+# POST /orders/batch: most operations accepted in one request
+ORDERS_BATCH_MAX_OPERATIONS = int(os.environ.get("ORDERS_BATCH_MAX_OPERATIONS", "1000"))
+
+# Broker import: rows parsed and inserted per batch
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", "5000"))
+# Background import jobs run on this many worker threads
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "2"))
+# Invalid rows listed on an import job (the skipped count still covers all of them)
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", "1000"))
+# Each app process refreshes its unfinished jobs' heartbeat this often; jobs whose heartbeat is
+# older than IMPORT_STALE_SECONDS belonged to a process that died and are failed
+IMPORT_HEARTBEAT_SECONDS = int(os.environ.get("IMPORT_HEARTBEAT_SECONDS", "30"))
+IMPORT_STALE_SECONDS = int(os.environ.get("IMPORT_STALE_SECONDS", "120"))
+
+# Daily price store: the latest day's bars are refetched at most this often
+PRICE_HISTORY_REFRESH_SECONDS = int(os.environ.get("PRICE_HISTORY_REFRESH_SECONDS", "3600"))
+
+# Risk metrics: annual risk-free rate for Sharpe/Sortino, benchmark index for beta, memoized results kept
+RISK_FREE_RATE = float(os.environ.get("RISK_FREE_RATE", "0.065"))
+RISK_BENCHMARK = os.environ.get("RISK_BENCHMARK", "^NSEI")
+RISK_CACHE_SIZE = int(os.environ.get("RISK_CACHE_SIZE", "1024"))
+
+# Background quote refresher for the open symbols of all users. Keep QUOTE_CACHE_SIZE above the universe size.
+QUOTE_REFRESH_ENABLED = os.environ.get("QUOTE_REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+QUOTE_REFRESH_SECONDS = int(os.environ.get("QUOTE_REFRESH_SECONDS", "60"))  # while the market is open
+QUOTE_REFRESH_CLOSED_SECONDS = int(os.environ.get("QUOTE_REFRESH_CLOSED_SECONDS", "1800"))  # while it is closed
+QUOTE_REFRESH_BACKOFF_SECONDS = int(os.environ.get("QUOTE_REFRESH_BACKOFF_SECONDS", "30"))  # doubled per failure
+QUOTE_REFRESH_MAX_BACKOFF_SECONDS = int(os.environ.get("QUOTE_REFRESH_MAX_BACKOFF_SECONDS", "1800"))
+# NSE regular session (holidays are not tracked; the refresher just sees unchanged prices)
+MARKET_TIMEZONE = os.environ.get("MARKET_TIMEZONE", "Asia/Kolkata")
+MARKET_OPEN = os.environ.get("MARKET_OPEN", "09:15")
+MARKET_CLOSE = os.environ.get("MARKET_CLOSE", "15:30")
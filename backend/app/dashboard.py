@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from .order_queries import load_orders
+from .auth import get_current_user_id, get_db
+from .market_data import get_quotes_async
+from .reference_data import get_reference_data
+from .positions import open_symbols
+from .snapshots import get_positions
+from .analysis import build_analysis
+from .enhanced_analysis import build_composition, build_performance, build_behavior
+
+router = APIRouter()
+
+DASHBOARD_SECTIONS = ("analysis", "composition", "performance", "behavior")
+
+@router.get("/portfolio/dashboard")
+async def get_dashboard(fields: str | None = None, db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    """Analysis, composition, performance and behavior in one response.
+
+    Orders, positions and quotes are loaded once and shared by every section.
+    `fields` optionally limits the response, e.g. ?fields=analysis,behavior
+    """
+    if fields:
+        sections = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in sections if f not in DASHBOARD_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown dashboard fields: {', '.join(unknown)}")
+    else:
+        sections = DASHBOARD_SECTIONS
+
+    orders = []
+    if "analysis" in sections or "behavior" in sections:
+        orders = await run_in_threadpool(load_orders, db, user_id)
+
+    holdings = {}
+    positions = None
+    quotes = None
+    if any(s in sections for s in ("analysis", "composition", "performance")):
+        positions = await run_in_threadpool(get_positions, db, user_id)
+        holdings = positions["holdings"]
+        quotes = await get_quotes_async(open_symbols(holdings))
+
+    # The build_* helpers are CPU-bound pandas work: keep them off the event loop
+    result = {}
+    if "analysis" in sections:
+        result["analysis"] = await run_in_threadpool(build_analysis, orders, positions, quotes)
+    if "composition" in sections:
+        reference = await run_in_threadpool(get_reference_data, db, open_symbols(holdings))
+        result["composition"] = await run_in_threadpool(build_composition, holdings, quotes, reference)
+    if "performance" in sections:
+        result["performance"] = await run_in_threadpool(build_performance, holdings, quotes)
+    if "behavior" in sections:
+        result["behavior"] = await run_in_threadpool(build_behavior, orders)
+    return result
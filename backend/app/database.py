@@ -1,8 +1,57 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from starlette.concurrency import run_in_threadpool
+from .config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE_SECONDS,
+    DB_POOL_PRE_PING,
+)
 
-engine = create_engine(DATABASE_URL)
+
+def pool_options(url):
+    """Connection pool settings from config; SQLite keeps SQLAlchemy's own (file/memory) pool."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
+
+# Optional async engine (e.g. asyncpg); None when ASYNC_DATABASE_URL is not set
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_URL:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+    # Loaded attributes stay readable after commit, when the response is serialized
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def run_sync(db, fn, *args):
+    """Call fn(session, *args), where fn is written against a regular Session.
+
+    With an AsyncSession it runs on the session's own connection without a
+    threadpool hop; with a plain Session it falls back to the threadpool.
+
+    Note that AsyncSession.run_sync runs fn on the event loop thread: only
+    the database round trips are awaited, while ORM work and anything else
+    fn computes block the loop. Keep it to short queries and writes, and run
+    heavy helpers with run_in_threadpool on a regular Session (get_db).
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
-import yfinance as yf
 from collections import defaultdict
 import math
-from .models import Order
-from .auth import get_current_user, get_db
+import numpy as np
+from .order_queries import load_orders
+from .auth import get_current_user_id, get_db
+from .market_data import get_quotes_async
+from .analytics import holdings_frame, value_holdings, allocation, records
+from .reference_data import get_reference_data
+from .positions import compute_positions, open_symbols
+from .snapshots import get_positions
 import os
 import psycopg2
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 from collections import defaultdict
 
@@ -25,200 +30,85 @@ MARKET_CAP_THRESHOLDS = {
 
 DB_URL = os.getenv('DATABASE_URL')
 
-def get_market_cap_category(market_cap_crores: float) -> str:
-    """Categorize stock by market cap (market_cap in Indian Rupees crores)"""
-    if market_cap_crores > MARKET_CAP_THRESHOLDS['large_cap']:
-        return 'Large Cap'
-    elif market_cap_crores > MARKET_CAP_THRESHOLDS['mid_cap']:
-        return 'Mid Cap'
-    else:
-        return 'Small Cap'
+COMPOSITION_FIELDS = ["quantity", "avg_buy_price", "current_price", "current_value", "sector", "market_cap_category", "market_cap"]
+PERFORMANCE_FIELDS = ["investment", "profit_loss", "return_percentage", "current_price"]
+
+def market_cap_categories(market_caps: pd.Series) -> pd.Series:
+    """Large/Mid/Small Cap for market caps in INR; missing or implausible caps are 'Unknown'"""
+    # yfinance returns market cap in INR; thresholds are in crores
+    crores = market_caps / 1e7
+    categories = np.select(
+        [crores > MARKET_CAP_THRESHOLDS['large_cap'], crores > MARKET_CAP_THRESHOLDS['mid_cap']],
+        ['Large Cap', 'Mid Cap'],
+        default='Small Cap',
+    )
+    known = market_caps.notna() & (market_caps < 1e15)  # Sanity check: < 1 quadrillion INR
+    return pd.Series(categories, index=market_caps.index).where(known, "Unknown")
 
 @router.get("/portfolio/composition")
-def get_portfolio_composition(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def get_portfolio_composition(db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
     """Get portfolio composition including sector and market cap allocation"""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.date).all()
-    
-    if not orders:
+    holdings = (await run_in_threadpool(get_positions, db, user_id))["holdings"]
+    symbols = open_symbols(holdings)
+    quotes = await get_quotes_async(symbols)
+    reference = await run_in_threadpool(get_reference_data, db, symbols)
+    return await run_in_threadpool(build_composition, holdings, quotes, reference)
+
+def build_composition(holdings, quotes, reference):
+    """Sector and market cap allocation of open holdings, valued at the given quotes"""
+    if not holdings:
         return {
             "sector_allocation": {},
             "market_cap_allocation": {},
             "holdings": []
         }
 
-    # Calculate holdings
-    holdings = {}
-    for order in orders:
-        symbol = order.symbol
-        if symbol not in holdings:
-            holdings[symbol] = {"quantity": 0, "avg_buy_price": 0, "investment": 0}
-        
-        if order.type == "buy":
-            prev_qty = holdings[symbol]["quantity"]
-            prev_investment = holdings[symbol]["investment"]
-            new_qty = prev_qty + order.quantity
-            new_investment = prev_investment + order.quantity * order.price
-            holdings[symbol]["quantity"] = new_qty
-            holdings[symbol]["investment"] = new_investment
-            holdings[symbol]["avg_buy_price"] = new_investment / new_qty if new_qty else 0
-        elif order.type == "sell":
-            holdings[symbol]["quantity"] -= order.quantity
-            holdings[symbol]["investment"] -= order.quantity * holdings[symbol]["avg_buy_price"]
-
-    # Filter out zero or negative holdings
-    current_holdings = {k: v for k, v in holdings.items() if v["quantity"] > 0}
-
-    # Calculate sector allocation
-    sector_allocation = defaultdict(float)
-    market_cap_allocation = defaultdict(float)
-    holdings_with_details = []
-
-    total_portfolio_value = 0
-
-    for symbol, holding in current_holdings.items():
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            # Fetch sector dynamically
-            sector = info.get("sector", "Others")
-            # Fetch market cap dynamically
-            market_cap = info.get("marketCap", None)
-            # Try alternative market cap fields
-            if market_cap is None or market_cap > 1e12:  # If > 1 trillion USD, likely wrong
-                market_cap = info.get("market_cap", None)
-            if market_cap is None or market_cap > 1e12:
-                market_cap = info.get("marketCap", None)
-            # Get current market price
-            price_data = ticker.history(period="1d")
-            if not price_data.empty:
-                current_price = float(price_data["Close"].iloc[-1])
-            else:
-                current_price = holding["avg_buy_price"]  # Fallback to buy price
-            current_value = holding["quantity"] * current_price
-            total_portfolio_value += current_value
-            # Sector allocation
-            sector_allocation[sector] += current_value
-            # Market cap allocation (use real market cap if available)
-            if market_cap is not None and market_cap < 1e15:  # Sanity check: < 1 quadrillion INR
-                # yfinance returns market cap in INR, convert to crores
-                market_cap_inr_crores = market_cap / 1e7  # Convert INR to crores
-                market_cap_category = get_market_cap_category(market_cap_inr_crores)
-            else:
-                market_cap_category = "Unknown"
-            market_cap_allocation[market_cap_category] += current_value
-            holdings_with_details.append({
-                "symbol": symbol,
-                "quantity": holding["quantity"],
-                "avg_buy_price": holding["avg_buy_price"],
-                "current_price": current_price,
-                "current_value": current_value,
-                "sector": sector,
-                "market_cap_category": market_cap_category,
-                "market_cap": market_cap
-            })
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-            continue
-
-    # Convert to percentages
-    sector_allocation_pct = {}
-    market_cap_allocation_pct = {}
-    
-    if total_portfolio_value > 0:
-        for sector, value in sector_allocation.items():
-            sector_allocation_pct[sector] = {
-                "value": value,
-                "percentage": (value / total_portfolio_value) * 100
-            }
-        for category, value in market_cap_allocation.items():
-            market_cap_allocation_pct[category] = {
-                "value": value,
-                "percentage": (value / total_portfolio_value) * 100
-            }
+    # Value open holdings (falling back to the buy price without a quote) and bucket them
+    frame = holdings_frame(holdings)
+    ref = pd.DataFrame.from_dict(
+        {symbol: reference.get(symbol, {}) for symbol in frame.index},
+        orient="index",
+        columns=["sector", "market_cap"],
+    ).reindex(frame.index)
+    frame["sector"] = ref["sector"].where(ref["sector"].notna() & (ref["sector"] != ""), "Others")
+    frame["market_cap"] = ref["market_cap"].astype(float)
+    prices = quotes.reindex(frame.index)["price"].astype(float)
+    frame["current_price"] = prices.fillna(frame["avg_buy_price"])
+    frame["current_value"] = frame["quantity"] * frame["current_price"]
+    frame["market_cap_category"] = market_cap_categories(frame["market_cap"])
+    total_portfolio_value = float(frame["current_value"].sum())
 
     return {
-        "sector_allocation": sector_allocation_pct,
-        "market_cap_allocation": market_cap_allocation_pct,
-        "holdings": holdings_with_details,
+        "sector_allocation": allocation(frame["current_value"], frame["sector"]),
+        "market_cap_allocation": allocation(frame["current_value"], frame["market_cap_category"]),
+        "holdings": records(frame, COMPOSITION_FIELDS),
         "total_portfolio_value": total_portfolio_value
     }
 
 @router.get("/portfolio/performance")
-def get_performance_analysis(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def get_performance_analysis(db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
     """Get only top gainers and losers for the user's portfolio."""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.date).all()
-    
-    if not orders:
+    holdings = (await run_in_threadpool(get_positions, db, user_id))["holdings"]
+    quotes = await get_quotes_async(open_symbols(holdings))
+    return await run_in_threadpool(build_performance, holdings, quotes)
+
+def build_performance(holdings, quotes):
+    """Top gainers and losers among open holdings, valued at the given quotes"""
+    if not holdings:
         return {
             "top_gainers": [],
             "top_losers": []
         }
 
-    holdings = {}
-    for order in orders:
-        symbol = order.symbol
-        if symbol not in holdings:
-            holdings[symbol] = {
-                "quantity": 0,
-                "avg_buy_price": 0,
-                "investment": 0,
-                "buy_lots": [],
-            }
-        if order.type == "buy":
-            prev_qty = holdings[symbol]["quantity"]
-            prev_investment = holdings[symbol]["investment"]
-            new_qty = prev_qty + order.quantity
-            new_investment = prev_investment + order.quantity * order.price
-            holdings[symbol]["quantity"] = new_qty
-            holdings[symbol]["investment"] = new_investment
-            holdings[symbol]["avg_buy_price"] = new_investment / new_qty if new_qty else 0
-            holdings[symbol]["buy_lots"].append({"quantity": order.quantity, "price": order.price})
-        elif order.type == "sell":
-            sell_qty = order.quantity
-            sell_price = order.price
-            buy_lots = holdings[symbol]["buy_lots"]
-            while sell_qty > 0 and buy_lots:
-                lot = buy_lots[0]
-                lot_qty = lot["quantity"]
-                if lot_qty > sell_qty:
-                    lot["quantity"] -= sell_qty
-                    holdings[symbol]["quantity"] -= sell_qty
-                    holdings[symbol]["investment"] -= sell_qty * lot["price"]
-                    sell_qty = 0
-                else:
-                    holdings[symbol]["quantity"] -= lot_qty
-                    holdings[symbol]["investment"] -= lot_qty * lot["price"]
-                    sell_qty -= lot_qty
-                    buy_lots.pop(0)
-            holdings[symbol]["avg_buy_price"] = (holdings[symbol]["investment"] / holdings[symbol]["quantity"]) if holdings[symbol]["quantity"] else 0
-
     # Calculate stock performance
-    stock_performance = []
-    for symbol, holding in holdings.items():
-        if holding["quantity"] <= 0:
-            continue
-        try:
-            ticker = yf.Ticker(symbol)
-            price_data = ticker.history(period="1d")
-            if price_data.empty:
-                current_price = None
-            else:
-                current_price = float(price_data["Close"].iloc[-1])
-            if current_price is None or current_price == 0:
-                continue
-            investment = holding["quantity"] * holding["avg_buy_price"]
-            profit_loss = (holding["quantity"] * current_price) - investment
-            return_percentage = (profit_loss / investment) * 100 if investment > 0 else 0
-            stock_performance.append({
-                "symbol": symbol,
-                "investment": investment,
-                "profit_loss": profit_loss,
-                "return_percentage": return_percentage,
-                "current_price": current_price
-            })
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-            continue
+    valued = value_holdings(holdings_frame(holdings), quotes)
+    valued = valued[valued["market_price"].notna() & (valued["market_price"] != 0)]
+    valued = valued.assign(
+        profit_loss=valued["unrealized_profit"],
+        return_percentage=(valued["unrealized_profit"] / valued["investment"] * 100).where(valued["investment"] > 0, 0.0),
+        current_price=valued["market_price"],
+    )
+    stock_performance = records(valued, PERFORMANCE_FIELDS)
 
     # Sort by return percentage
     stock_performance.sort(key=lambda x: x["return_percentage"], reverse=True)
@@ -232,10 +122,13 @@ def get_performance_analysis(db: Session = Depends(get_db), current_user=Depends
     }
 
 @router.get("/portfolio/behavior")
-def get_transaction_behavior(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def get_transaction_behavior(db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
     """Get transaction behavior analysis including holding time, win rate, trading frequency"""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.date).all()
-    
+    orders = await run_in_threadpool(load_orders, db, user_id)
+    return await run_in_threadpool(build_behavior, orders)
+
+def build_behavior(orders):
+    """Holding time, win rate and trading frequency from date-ordered orders"""
     if not orders:
         return {
             "average_holding_time": 0,
@@ -244,48 +137,22 @@ def get_transaction_behavior(db: Session = Depends(get_db), current_user=Depends
             "total_trades": 0
         }
 
-    # Group orders by symbol to calculate holding periods
-    symbol_orders = defaultdict(list)
-    for order in orders:
-        symbol_orders[order.symbol].append(order)
+    # Match sells against earlier buys (FIFO) to get completed trades
+    round_trips = compute_positions(orders, with_round_trips=True)["round_trips"]
 
     holding_periods = []
     profitable_trades = 0
     total_trades = 0
 
-    for symbol, symbol_order_list in symbol_orders.items():
-        # Sort orders by date
-        symbol_order_list.sort(key=lambda x: x.date)
-        
-        buy_orders = [o for o in symbol_order_list if o.type == "buy"]
-        sell_orders = [o for o in symbol_order_list if o.type == "sell"]
-        
-        # Calculate holding periods for completed trades
-        for sell_order in sell_orders:
-            # Find corresponding buy orders (FIFO)
-            remaining_sell_qty = sell_order.quantity
-            sell_price = sell_order.price
-            
-            for buy_order in buy_orders:
-                if remaining_sell_qty <= 0:
-                    break
-                    
-                if buy_order.quantity > 0:
-                    trade_qty = min(remaining_sell_qty, buy_order.quantity)
-                    holding_period = (sell_order.date - buy_order.date).days
-                    
-                    if holding_period > 0:
-                        holding_periods.append(holding_period)
-                        
-                        # Calculate if trade was profitable
-                        buy_price = buy_order.price
-                        profit = (sell_price - buy_price) * trade_qty
-                        if profit > 0:
-                            profitable_trades += 1
-                        total_trades += 1
-                    
-                    remaining_sell_qty -= trade_qty
-                    buy_order.quantity -= trade_qty
+    for trade in round_trips:
+        holding_period = (trade["sell_date"] - trade["buy_date"]).days
+        if holding_period > 0:
+            holding_periods.append(holding_period)
+            # Calculate if trade was profitable
+            profit = (trade["sell_price"] - trade["buy_price"]) * trade["quantity"]
+            if profit > 0:
+                profitable_trades += 1
+            total_trades += 1
 
     # Calculate metrics
     average_holding_time = sum(holding_periods) / len(holding_periods) if holding_periods else 0
@@ -1,14 +1,56 @@
+import hashlib
 import os
+import threading
+from collections import OrderedDict
 import openai
+from .config import GROQ_BASE_URL, GROQ_MODEL, SUMMARY_CACHE_SIZE
 
-client = openai.OpenAI(
+client = openai.AsyncOpenAI(
     api_key=os.getenv("GROQ_API_KEY"),
-    base_url="https://api.groq.com/openai/v1"
+    base_url=GROQ_BASE_URL
 )
 
-def ask_groq(prompt, model="llama3-70b-8192"):
-    response = client.chat.completions.create(
+def set_client(new_client):
+    """Swap the LLM client, e.g. for one pointed at a local fake server."""
+    global client
+    client = new_client
+
+async def ask_groq(prompt, model=GROQ_MODEL):
+    response = await client.chat.completions.create(
         model=model,
         messages=[{"role": "user", "content": prompt}]
     )
-    return response.choices[0].message.content 
\ No newline at end of file
+    return response.choices[0].message.content
+
+async def stream_groq(prompt, model=GROQ_MODEL):
+    """Yield the completion text as it is generated."""
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# Completed summaries, keyed by model + normalized order history
+_summary_cache = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+def summary_cache_key(order_history: str, model=GROQ_MODEL) -> str:
+    lines = sorted(line.strip() for line in order_history.splitlines() if line.strip())
+    return hashlib.sha256((model + "\n" + "\n".join(lines)).encode("utf-8")).hexdigest()
+
+def get_cached_summary(key):
+    with _summary_cache_lock:
+        summary = _summary_cache.get(key)
+        if summary is not None:
+            _summary_cache.move_to_end(key)
+        return summary
+
+def cache_summary(key, summary):
+    with _summary_cache_lock:
+        _summary_cache[key] = summary
+        _summary_cache.move_to_end(key)
+        while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+            _summary_cache.popitem(last=False)
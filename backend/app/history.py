@@ -0,0 +1,72 @@
+from datetime import date
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+import pandas as pd
+from .auth import get_current_user_id, get_db
+from .order_queries import load_order_frame
+from .analytics import holding_changes
+from . import price_history
+
+router = APIRouter()
+
+
+def load_history_inputs(db: Session, user_id, extra_symbols=()):
+    """Orders plus stored daily closes covering them, fetching missing price history first.
+
+    `extra_symbols` (e.g. a benchmark index) get closes over the same dates.
+    """
+    orders = load_order_frame(db, user_id)
+    if orders.empty:
+        return orders, pd.DataFrame()
+    first_day = orders["date"].min().date()
+    symbols = orders["symbol"].unique().tolist() + list(extra_symbols)
+    price_history.ensure_history(db, symbols, first_day)
+    return orders, price_history.load_closes(db, symbols, first_day)
+
+
+@router.get("/portfolio/history")
+async def get_portfolio_history(start: date | None = None, db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    """Daily portfolio value, invested capital and P&L since the first order (or `start`)."""
+    orders, closes = await run_in_threadpool(load_history_inputs, db, user_id)
+    return {"history": build_history(orders, closes, start)}
+
+
+def daily_holdings(orders, closes, end=None):
+    """Day-by-day held quantities, prices and net invested capital.
+
+    Returns (calendar, quantities, prices, invested): quantities and prices are
+    date x symbol frames over the trading days in `closes` plus order days, up
+    to `end` (default today). Quantities come from a cumulative sum of the
+    orders' effective quantity changes; days before a symbol's first stored
+    close are priced at its latest trade price.
+    """
+    days = orders["date"].dt.normalize()
+    end = pd.Timestamp(end or date.today())
+    calendar = closes.index.union(pd.DatetimeIndex(days.unique()))
+    if len(calendar) == 0 or calendar[-1] < end:
+        calendar = calendar.union(pd.DatetimeIndex([end]))
+    calendar = calendar[(calendar >= days.min()) & (calendar <= end)]
+
+    changes = holding_changes(orders)
+    by_day = [days, orders["symbol"]]
+    quantities = changes["quantity"].groupby(by_day).sum().unstack(fill_value=0.0)
+    quantities = quantities.reindex(calendar, fill_value=0.0).cumsum()
+    invested = changes["cash"].groupby(days).sum().reindex(calendar, fill_value=0.0).cumsum()
+
+    trade_prices = orders["price"].groupby(by_day).last().unstack().reindex(calendar).ffill()
+    prices = closes.reindex(index=calendar, columns=quantities.columns).ffill().fillna(trade_prices)
+    return calendar, quantities, prices, invested
+
+
+def build_history(orders, closes, start=None):
+    """[{date, value, invested, profit_loss}] per day from an order frame and a daily close frame."""
+    if orders.empty:
+        return []
+    calendar, quantities, prices, invested = daily_holdings(orders, closes)
+    value = (quantities * prices).sum(axis=1)
+    history = pd.DataFrame({"value": value, "invested": invested, "profit_loss": value - invested}, index=calendar)
+    if start is not None:
+        history = history[history.index >= pd.Timestamp(start)]
+    history.index = history.index.strftime("%Y-%m-%d")
+    return history.rename_axis("date").reset_index().to_dict("records")
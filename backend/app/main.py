@@ -5,18 +5,28 @@ from .portfolio import router as portfolio_router
 from .analysis import router as analysis_router
 from .enhanced_analysis import router as enhanced_analysis_router
 from .broker_import import router as broker_import_router
+from .dashboard import router as dashboard_router
+from .history import router as history_router
+from .risk import router as risk_router
 from fastapi.responses import StreamingResponse, JSONResponse
 import io
-from .groq_utils import ask_groq
-import httpx
+from .groq_utils import ask_groq, stream_groq, summary_cache_key, get_cached_summary, cache_summary
+from .config import GROQ_MODEL
+from .market_data import close_market_data
+from .quote_refresher import start_quote_refresher, stop_quote_refresher
+from .password_hashing import shutdown_password_pool
+from .broker_import import start_job_heartbeat, stop_job_heartbeat
 from fastapi import Depends
-from .auth import get_current_user
+from .auth import get_current_user_id, get_db
+from .order_queries import load_orders
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from fastapi import HTTPException
 import os
 from sqlalchemy import inspect
-from .database import Base, engine
+from .database import Base, engine, async_engine
 import app.models
-import subprocess
+from .migrations import upgrade_database
 
 app = FastAPI()
 
@@ -26,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(auth_router)
@@ -33,6 +44,27 @@ app.include_router(portfolio_router)
 app.include_router(analysis_router)
 app.include_router(enhanced_analysis_router)
 app.include_router(broker_import_router)
+app.include_router(dashboard_router)
+app.include_router(history_router)
+app.include_router(risk_router)
+
+@app.on_event("startup")
+async def start_background_refresh():
+    start_quote_refresher()
+
+@app.on_event("startup")
+async def start_import_heartbeat():
+    # Keeps this process's import jobs alive and fails jobs of processes that died
+    start_job_heartbeat()
+
+@app.on_event("shutdown")
+async def shutdown_market_data():
+    await stop_quote_refresher()
+    await stop_job_heartbeat()
+    await close_market_data()
+    shutdown_password_pool()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 #to prevent cold starts on Render 
 @app.api_route("/ping", methods=["GET", "HEAD"])
@@ -45,40 +77,41 @@ def read_root():
     
 @app.get("/init-db")  # Optional: change to POST for safety
 def init_db():
+    # Apply pending Alembic migrations in-process (same as `alembic upgrade head`)
     try:
-        result = subprocess.run(["python", "create_tables.py"], check=True, capture_output=True, text=True)
+        before, after = upgrade_database()
         return {
-            "status": "✅ Tables created successfully!",
-            "output": result.stdout
+            "status": "✅ Database is up to date",
+            "from_revision": before,
+            "revision": after,
         }
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         return {
-            "status": "❌ Error running create_tables.py",
-            "error": e.stderr
+            "status": "❌ Error running migrations",
+            "error": str(e)
         }
-async def get_order_history(user_token: str, base_url: str = "https://portfolio-analyzer-9o19.onrender.com"):
-    headers = {"Authorization": f"Bearer {user_token}"}
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        analysis = (await client.get(f"{base_url}/portfolio/analysis", headers=headers)).json()
-    orders = analysis.get("orders", [])
+
+def format_order_history(orders):
     order_lines = [
-        f"{o['date']} | {o['type'].upper():4} | {o['symbol']:8} | Qty: {o['quantity']:>4} | Price: {o['price']:.2f}"
+        f"{o.date.strftime('%Y-%m-%d')} | {o.type.upper():4} | {o.symbol:8} | Qty: {o.quantity:>4} | Price: {o.price:.2f}"
         for o in orders
     ]
-    order_history_str = "\n".join(order_lines)
-    return order_history_str
+    return "\n".join(order_lines)
 
 @app.post("/api/ai/summary")
-async def summarize_portfolio(request: Request, current_user=Depends(get_current_user)):
-    user_token = request.headers.get("authorization")
-    if not user_token:
-        return JSONResponse({"error": "Missing authorization token"}, status_code=401)
-    # Remove 'Bearer ' prefix if present
-    if user_token.lower().startswith("bearer "):
-        user_token = user_token[7:]
-    order_history = await get_order_history(user_token)
+async def summarize_portfolio(stream: bool = False, db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    # Read the order list straight from the DB; no need to recompute the full analysis
+    orders = await run_in_threadpool(load_orders, db, user_id)
+    order_history = format_order_history(orders)
     if not order_history.strip():
         return {"summary": ""}  # Or you can return a message like "No orders found for this user."
+    # Unchanged order history + model -> reuse the earlier summary
+    cache_key = summary_cache_key(order_history, GROQ_MODEL)
+    cached = get_cached_summary(cache_key)
+    if cached is not None:
+        if stream:
+            return StreamingResponse(iter([cached]), media_type="text/plain")
+        return {"summary": cached}
     prompt = (
         "You are a financial assistant. Analyze the following order history for the user.\n\n"
         "Your response MUST have exactly two sections, in this order:\n"
@@ -92,5 +125,14 @@ async def summarize_portfolio(request: Request, current_user=Depends(get_current
         "- Use clear, non-technical language.\n\n"
         f"Order history:\n{order_history}\n\nYour response:"
     )
-    summary = ask_groq(prompt)
+    if stream:
+        async def generate():
+            parts = []
+            async for part in stream_groq(prompt, GROQ_MODEL):
+                parts.append(part)
+                yield part
+            cache_summary(cache_key, "".join(parts))
+        return StreamingResponse(generate(), media_type="text/plain")
+    summary = await ask_groq(prompt, GROQ_MODEL)
+    cache_summary(cache_key, summary)
     return {"summary": summary} 
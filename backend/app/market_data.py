@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import pandas as pd
+from .config import QUOTE_TTL_SECONDS, QUOTE_CACHE_SIZE
+from .providers import QUOTE_COLUMNS, MarketDataProvider, create_provider
+
+# Failed lookups are remembered for a shorter time so a bad symbol
+# doesn't hit Yahoo on every request, but recovers quickly.
+NEGATIVE_TTL_SECONDS = 15
+
+def _row_to_quote(row):
+    if pd.isna(row["price"]):
+        return None
+    return {column: (None if pd.isna(row[column]) else float(row[column])) for column in QUOTE_COLUMNS}
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None  # set when the fetch failed or its owner was cancelled; nothing was cached
+        self.async_waiters = []  # (loop, future) pairs woken when the fetch finishes
+
+    def finish(self):
+        self.done.set()
+        for loop, future in self.async_waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _abandoned(flight):
+    """True when the owner was cancelled (or died) before fetching: waiters must fetch for themselves."""
+    return flight.error is not None and not isinstance(flight.error, Exception)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class QuoteCache:
+    """Process-wide quote cache with per-symbol TTL, LRU eviction and single-flight fetches.
+
+    Misses are resolved with one batched provider call. Concurrent callers asking
+    for a symbol that is already being fetched wait on that fetch instead of
+    going to the network again, whether they are threads or coroutines.
+    """
+
+    def __init__(self, provider=None, ttl: float = QUOTE_TTL_SECONDS, maxsize: int = QUOTE_CACHE_SIZE):
+        self.provider = provider or create_provider()
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # symbol -> (expires_at, quote)
+        self._inflight = {}  # symbol -> _Flight
+        self._lock = threading.Lock()
+
+    def _lookup(self, symbol):
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return False, None
+        expires_at, quote = entry
+        if expires_at <= time.monotonic():
+            del self._entries[symbol]
+            return False, None
+        self._entries.move_to_end(symbol)
+        return True, quote
+
+    def _store(self, symbol, quote, ttl=None):
+        ttl = ttl or self.ttl
+        if quote is None:
+            ttl = min(ttl, NEGATIVE_TTL_SECONDS)
+        self._entries[symbol] = (time.monotonic() + ttl, quote)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _claim(self, symbols):
+        """Split symbols into cache hits, misses this caller must fetch, and fetches already in flight."""
+        results = {}
+        owned = {}
+        waiting = {}
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                hit, quote = self._lookup(symbol)
+                if hit:
+                    results[symbol] = quote
+                elif symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    owned[symbol] = self._inflight[symbol] = _Flight()
+        return results, owned, waiting
+
+    def _complete(self, owned, table, results):
+        for symbol, flight in owned.items():
+            flight.result = _row_to_quote(table.loc[symbol]) if symbol in table.index else None
+        with self._lock:
+            for symbol, flight in owned.items():
+                self._store(symbol, flight.result)
+                del self._inflight[symbol]
+                results[symbol] = flight.result
+                flight.finish()
+
+    def _fail(self, owned, error, results):
+        """Release the owned flights without caching anything; re-raises cancellation."""
+        with self._lock:
+            for symbol, flight in owned.items():
+                flight.error = error
+                del self._inflight[symbol]
+                flight.finish()
+        if not isinstance(error, Exception):
+            raise error
+        print(f"Error fetching quotes for {list(owned)}: {error}")
+        results.update(dict.fromkeys(owned))
+
+    def get_many(self, symbols):
+        """Return {symbol: quote or None} for the given symbols."""
+        results, owned, waiting = self._claim(symbols)
+        if owned:
+            try:
+                table = self.provider.fetch_quotes(list(owned))
+            except BaseException as e:
+                self._fail(owned, e, results)
+            else:
+                self._complete(owned, table, results)
+
+        retry = []
+        for symbol, flight in waiting.items():
+            flight.done.wait()
+            if _abandoned(flight):
+                retry.append(symbol)
+            else:
+                results[symbol] = flight.result
+        if retry:
+            results.update(self.get_many(retry))
+        return results
+
+    async def aget_many(self, symbols):
+        """Async get_many: fetches misses without blocking the event loop."""
+        results, owned, waiting = self._claim(symbols)
+        if owned:
+            try:
+                table = await self.provider.fetch_quotes_async(list(owned))
+            except BaseException as e:
+                self._fail(owned, e, results)
+            else:
+                self._complete(owned, table, results)
+
+        loop = asyncio.get_running_loop()
+        retry = []
+        for symbol, flight in waiting.items():
+            future = loop.create_future()
+            with self._lock:
+                pending = not flight.done.is_set()
+                if pending:
+                    flight.async_waiters.append((loop, future))
+            if pending:
+                await future
+            if _abandoned(flight):
+                retry.append(symbol)
+            else:
+                results[symbol] = flight.result
+        if retry:
+            results.update(await self.aget_many(retry))
+        return results
+
+    def get(self, symbol: str):
+        return self.get_many([symbol])[symbol]
+
+    def put_many(self, table, ttl=None):
+        """Store quotes fetched elsewhere (e.g. by the background refresher) for `ttl` seconds.
+
+        Symbols without a price are skipped so a failed refresh never replaces a good quote.
+        """
+        with self._lock:
+            for symbol in table.index:
+                quote = _row_to_quote(table.loc[symbol])
+                if quote is not None:
+                    self._store(symbol, quote, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+quote_cache = QuoteCache()
+
+
+def get_provider() -> MarketDataProvider:
+    return quote_cache.provider
+
+
+def set_provider(provider):
+    """Swap the market data provider, e.g. for a StubProvider or FixtureProvider."""
+    quote_cache.provider = provider
+    quote_cache.clear()
+
+
+async def close_market_data():
+    """Close pooled connections held by the active provider."""
+    aclose = getattr(quote_cache.provider, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def fetch_history(symbols, start, end):
+    """Daily bars for start..end from the active provider (no caching; see price_history for the store)."""
+    return quote_cache.provider.fetch_history(symbols, start, end)
+
+
+def _quote_table(quotes):
+    # Built in one go: per-row .loc assignment costs ~1ms a symbol
+    rows = [[quote[column] if quote else None for column in QUOTE_COLUMNS] for quote in quotes.values()]
+    return pd.DataFrame(rows, index=pd.Index(list(quotes), name="symbol"), columns=QUOTE_COLUMNS, dtype=float)
+
+
+async def get_quotes_async(symbols):
+    """Price table (indexed by symbol) for all symbols; misses are fetched in one batch without blocking the event loop."""
+    quotes = await quote_cache.aget_many(symbols)
+    return _quote_table(quotes)
+
@@ -0,0 +1,29 @@
+import os
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from .database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+def alembic_config():
+    config = Config(ALEMBIC_INI)
+    # Resolve migrations/ relative to alembic.ini, not the current directory
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    return config
+
+
+def current_revision():
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def upgrade_database(revision: str = "head"):
+    """Apply pending migrations in-process. Returns (revision before, revision after)."""
+    before = current_revision()
+    with engine.begin() as connection:
+        config = alembic_config()
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+    return before, current_revision()
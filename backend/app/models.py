@@ -1,13 +1,15 @@
+import threading
+import time
 import uuid
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Column, String, Float, Integer, Date, DateTime, ForeignKey, JSON, UniqueConstraint, Index
+from sqlalchemy import Uuid  # native uuid on PostgreSQL, CHAR(32) elsewhere (e.g. SQLite)
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
 
 class User(Base):
     __tablename__ = "users"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True)
     email = Column(String, unique=True, index=True, nullable=True)
     phone = Column(String, unique=True, index=True, nullable=True)
     hashed_password = Column(String, nullable=False)
@@ -17,16 +19,106 @@ class User(Base):
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, phone={self.phone})>"
 
+_order_seq_lock = threading.Lock()
+_last_order_seq = 0
+
+def next_order_seq():
+    """Increasing insertion stamp (ns clock, strictly increasing within the process) for Order.seq."""
+    global _last_order_seq
+    with _order_seq_lock:
+        _last_order_seq = max(_last_order_seq + 1, time.time_ns())
+        return _last_order_seq
+
 class Order(Base):
     __tablename__ = "orders"
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False)
     symbol = Column(String, index=True, nullable=False)
     quantity = Column(Float, nullable=False)
     price = Column(Float, nullable=False)
     date = Column(DateTime, nullable=False)
     type = Column(String, nullable=False)  # 'buy' or 'sell'
+    fingerprint = Column(String, nullable=True)  # set for imported trades with an execution time so re-imports can be skipped
+    # Insertion order: FIFO replays orders by (date, seq, id), so same-timestamp trades keep the order they were entered in
+    seq = Column(BigInteger, nullable=False, default=next_order_seq, server_default="0")
     user = relationship("User", back_populates="orders")
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "fingerprint", name="uq_orders_user_fingerprint"),
+        # Every analysis read is "this user's orders by date", optionally for one symbol; id completes
+        # the (date, id) keyset that GET /orders pages on
+        Index("ix_orders_user_id_date_id", "user_id", "date", "id"),
+        Index("ix_orders_user_id_symbol_date_id", "user_id", "symbol", "date", "id"),
+    )
+
+    def __repr__(self):
+        return f"<Order(id={self.id}, symbol={self.symbol}, quantity={self.quantity}, type={self.type}, user_id={self.user_id})>" 
+
+class Instrument(Base):
+    __tablename__ = "instruments"
+    symbol = Column(String, primary_key=True, index=True)
+    sector = Column(String, nullable=True)
+    market_cap = Column(Float, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Instrument(symbol={self.symbol}, sector={self.sector}, market_cap={self.market_cap})>"
+
+# Materialized FIFO position per user and symbol, kept in step with orders
+class PositionSnapshot(Base):
+    __tablename__ = "position_snapshots"
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    symbol = Column(String, primary_key=True)
+    quantity = Column(Float, nullable=False, default=0)
+    investment = Column(Float, nullable=False, default=0)
+    realized_profit = Column(Float, nullable=False, default=0)
+    buy_lots = Column(JSON, nullable=False, default=list)  # [[quantity, price, iso date], ...] in FIFO order
+    last_order_date = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<PositionSnapshot(user_id={self.user_id}, symbol={self.symbol}, quantity={self.quantity})>"
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True)
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done or failed
+    processed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    duplicates = Column(Integer, nullable=False, default=0)  # rows already imported earlier
+    errors = Column(JSON, nullable=False, default=list)
+    detail = Column(String, nullable=True)  # why the job failed, if it did
+    owner = Column(String, nullable=True)  # broker_import.WORKER_ID of the process running the job
+    heartbeat_at = Column(DateTime, nullable=True)  # refreshed by the owner while the job is unfinished
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ImportJob(id={self.id}, status={self.status}, processed={self.processed})>"
+# Daily OHLC bars, fetched once per symbol and extended incrementally
+class DailyPrice(Base):
+    __tablename__ = "daily_prices"
+    symbol = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    open = Column(Float, nullable=True)
+    high = Column(Float, nullable=True)
+    low = Column(Float, nullable=True)
+    close = Column(Float, nullable=True)
+    volume = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f"<DailyPrice(symbol={self.symbol}, date={self.date}, close={self.close})>"
+
+# Date range already fetched into daily_prices for a symbol (holidays included, so no refetching gaps)
+class PriceHistoryRange(Base):
+    __tablename__ = "price_history_ranges"
+    symbol = Column(String, primary_key=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
     def __repr__(self):
-        return f"<Order(id={self.id}, symbol={self.symbol}, quantity={self.quantity}, type={self.type}, user_id={self.user_id})>" 
\ No newline at end of file
+        return f"<PriceHistoryRange(symbol={self.symbol}, start_date={self.start_date}, end_date={self.end_date})>"
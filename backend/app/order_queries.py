@@ -0,0 +1,51 @@
+import pandas as pd
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from .models import Order
+
+# The analysis code only reads these. Selecting them as plain rows skips ORM
+# hydration and the identity map, which dominates load time on long histories.
+ORDER_COLUMNS = (Order.id, Order.symbol, Order.quantity, Order.price, Order.date, Order.type)
+
+
+def _orders_query(user_id, symbols=None):
+    query = select(*ORDER_COLUMNS).where(Order.user_id == user_id)
+    if symbols is not None:
+        query = query.where(Order.symbol.in_(list(symbols)))
+    # Same-timestamp orders replay in the order they were entered (see Order.seq)
+    return query.order_by(Order.date, Order.seq, Order.id)
+
+
+def load_orders(db: Session, user_id, symbol=None):
+    """A user's orders (optionally one symbol's), oldest first, as lightweight rows.
+
+    Rows expose the same attributes as Order (row.symbol, row.date, ...) but are
+    read-only and not tracked by the session.
+    """
+    return db.execute(_orders_query(user_id, None if symbol is None else [symbol])).all()
+
+
+def load_order_frame(db: Session, user_id, symbols=None):
+    """Like load_orders, but as a columnar pandas frame for the analytics kernel."""
+    rows = db.execute(_orders_query(user_id, symbols)).all()
+    return pd.DataFrame.from_records(rows, columns=[column.key for column in ORDER_COLUMNS])
+
+
+def order_list_query(user_id, symbol=None, order_type=None, start=None, end=None, before=None):
+    """A user's orders newest first by (date, id), with optional filters (dates inclusive).
+
+    `before` is the (date, id) of the last row already returned; rows after it
+    are found by a keyset seek on the (user_id, date, id) index rather than OFFSET.
+    """
+    query = select(*ORDER_COLUMNS).where(Order.user_id == user_id)
+    if symbol is not None:
+        query = query.where(Order.symbol == symbol)
+    if order_type is not None:
+        query = query.where(Order.type == order_type)
+    if start is not None:
+        query = query.where(Order.date >= start)
+    if end is not None:
+        query = query.where(Order.date <= end)
+    if before is not None:
+        query = query.where(tuple_(Order.date, Order.id) < tuple_(*before))
+    return query.order_by(Order.date.desc(), Order.id.desc())
@@ -0,0 +1,73 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+
+# Hashes made with a different cost than BCRYPT_ROUNDS count as outdated and are upgraded on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+
+# Run inside the worker processes
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password, hashed_password):
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # spawn, not fork: the server process already runs threads
+            _executor = ProcessPoolExecutor(PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+async def _submit(fn, *args):
+    """Run fn in the hashing pool, or fail fast with 503 once PASSWORD_HASH_MAX_PENDING calls are in flight."""
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Too many sign-in requests, try again shortly", headers={"Retry-After": "1"})
+        _pending += 1
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _release(None)
+        raise
+    # Released when the worker finishes, not when this request does: a cancelled
+    # or timed-out request leaves its hash running, and it still counts
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+def _release(future):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _submit(_hash, password)
+
+
+async def verify_password_async(password: str, hashed_password: str):
+    """(matches, new_hash); new_hash is set when the stored hash should be replaced (e.g. BCRYPT_ROUNDS changed)."""
+    return await _submit(_verify_and_update, password, hashed_password)
+
+
+def shutdown_password_pool():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
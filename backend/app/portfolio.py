@@ -1,21 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, update, delete, insert, bindparam
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
-from typing import List
-from datetime import datetime
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, List, Literal, Union
+from datetime import datetime, timezone
+import base64
+import binascii
+import json
 import uuid
 from .models import Order
-from .database import SessionLocal
-from .auth import get_current_user, get_db
+from .database import engine, run_sync
+from .order_queries import order_list_query
+from .config import ORDERS_PAGE_SIZE, ORDERS_MAX_PAGE_SIZE, ORDERS_EXPORT_BATCH_SIZE, ORDERS_BATCH_MAX_OPERATIONS
+from .auth import get_current_user_id, get_db, get_async_db
+from . import snapshots
 
 router = APIRouter()
 
+def _naive_utc(value: datetime) -> datetime:
+    # Order dates are stored naive UTC; offsets would make them incomparable with stored dates
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+OrderDate = Annotated[datetime, AfterValidator(_naive_utc)]
+
 # Pydantic Schemas
 class OrderBase(BaseModel):
     symbol: str = Field(..., example="INFY.NS")
     quantity: float
     price: float
-    date: datetime
+    date: OrderDate
     type: str = Field(..., example="buy")  # 'buy' or 'sell'
 
 class OrderCreate(OrderBase):
@@ -24,7 +41,7 @@ class OrderCreate(OrderBase):
 class OrderUpdate(BaseModel):
     quantity: float | None = None
     price: float | None = None
-    date: datetime | None = None
+    date: OrderDate | None = None
     type: str | None = None
 
 class OrderOut(OrderBase):
@@ -32,12 +49,43 @@ class OrderOut(OrderBase):
     class Config:
         orm_mode = True
 
-# Add order
-@router.post("/orders/add", response_model=OrderOut)
-def add_order(order_in: OrderCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+# Batch operations, told apart by "op"
+class CreateOperation(BaseModel):
+    op: Literal["create"]
+    order: OrderCreate
+
+class UpdateOperation(BaseModel):
+    op: Literal["update"]
+    id: uuid.UUID
+    changes: OrderUpdate
+
+class DeleteOperation(BaseModel):
+    op: Literal["delete"]
+    id: uuid.UUID
+
+class OrderBatch(BaseModel):
+    operations: List[Annotated[Union[CreateOperation, UpdateOperation, DeleteOperation], Field(discriminator="op")]] = Field(
+        ..., min_length=1, max_length=ORDERS_BATCH_MAX_OPERATIONS
+    )
+    # All or nothing: with any failed operation, apply none of them
+    atomic: bool = False
+
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    id: uuid.UUID | None = None
+    status: Literal["ok", "error"]
+    detail: str | None = None
+
+class BatchOut(BaseModel):
+    applied: int
+    results: List[BatchResult]
+
+# Sync helpers, run on the request's session through database.run_sync
+def _add_order(db: Session, user_id, order_in: OrderCreate):
     order = Order(
         id=uuid.uuid4(),
-        user_id=current_user.id,
+        user_id=user_id,
         symbol=order_in.symbol,
         quantity=order_in.quantity,
         price=order_in.price,
@@ -45,24 +93,47 @@ def add_order(order_in: OrderCreate, db: Session = Depends(get_db), current_user
         type=order_in.type,
     )
     db.add(order)
+    snapshots.record_new_order(db, order)
     db.commit()
     db.refresh(order)
     return order
 
-# Get all orders for user
-@router.get("/orders", response_model=List[OrderOut])
-def get_orders(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    orders = db.query(Order).filter(Order.user_id == current_user.id).all()
-    return orders
+def _list_orders(db: Session, query, limit):
+    return db.execute(query.limit(limit)).all()
 
-# Update order
-@router.put("/orders/update/{order_id}", response_model=OrderOut)
-def update_order(order_id: uuid.UUID, order_in: OrderUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+# Keyset cursors: the (date, id) of the last order on a page, opaque to clients
+def _encode_cursor(order):
+    return base64.urlsafe_b64encode(f"{order.date.isoformat()}|{order.id.hex}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        date, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(date), uuid.UUID(order_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _order_json(order):
+    return {
+        "id": str(order.id),
+        "symbol": order.symbol,
+        "quantity": order.quantity,
+        "price": order.price,
+        "date": order.date.isoformat(),
+        "type": order.type,
+    }
+
+def _stream_ndjson(query):
+    # Own connection with a server-side cursor: rows are sent as they arrive, never all held in memory
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=ORDERS_EXPORT_BATCH_SIZE).execute(query)
+        for rows in result.partitions():
+            yield "".join(json.dumps(_order_json(row)) + "\n" for row in rows)
+
+# Other users' orders are reported exactly like missing ones, as in _apply_batch
+def _update_order(db: Session, user_id, order_id, order_in: OrderUpdate):
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    if order.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to update this order")
     if order_in.quantity is not None:
         order.quantity = order_in.quantity
     if order_in.price is not None:
@@ -71,24 +142,137 @@ def update_order(order_id: uuid.UUID, order_in: OrderUpdate, db: Session = Depen
         order.date = order_in.date
     if order_in.type is not None:
         order.type = order_in.type
+    snapshots.rebuild_symbol(db, user_id, order.symbol)
     db.commit()
     db.refresh(order)
     return order
 
-# Delete order
-@router.delete("/orders/delete/{order_id}", status_code=204)
-def delete_order(order_id: uuid.UUID, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+def _delete_order(db: Session, user_id, order_id):
+    order = db.query(Order).filter(Order.id == order_id, Order.user_id == user_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    if order.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this order")
     db.delete(order)
+    snapshots.rebuild_symbol(db, user_id, order.symbol)
     db.commit()
+
+def _delete_all_orders(db: Session, user_id):
+    db.query(Order).filter(Order.user_id == user_id).delete()
+    snapshots.clear_user(db, user_id)
+    db.commit()
+
+def _apply_batch(db: Session, user_id, batch: OrderBatch):
+    """Apply a batch in one transaction: one ownership query, then bulk INSERT/UPDATE/DELETE scoped by user_id."""
+    ops = batch.operations
+    results = [None] * len(ops)
+    target_ids = [op.id for op in ops if op.op != "create"]
+    owned = dict(db.execute(
+        select(Order.id, Order.symbol).where(Order.user_id == user_id, Order.id.in_(target_ids))
+    ).all()) if target_ids else {}
+
+    # Validate every operation before writing anything
+    seen = set()
+    for i, op in enumerate(ops):
+        if op.op == "create":
+            results[i] = BatchResult(index=i, op=op.op, id=uuid.uuid4(), status="ok")
+        elif op.id not in owned:
+            # Other users' orders are reported exactly like missing ones
+            results[i] = BatchResult(index=i, op=op.op, id=op.id, status="error", detail="Order not found")
+        elif op.id in seen:
+            results[i] = BatchResult(index=i, op=op.op, id=op.id, status="error", detail="Order appears more than once in the batch")
+        else:
+            seen.add(op.id)
+            results[i] = BatchResult(index=i, op=op.op, id=op.id, status="ok")
+    failed = any(r.status == "error" for r in results)
+    if failed and batch.atomic:
+        return BatchOut(applied=0, results=[r if r.status == "error" else r.model_copy(update={"status": "error", "detail": "Not applied"}) for r in results])
+
+    ok = [(op, r) for op, r in zip(ops, results) if r.status == "ok"]
+    creates = [
+        {"id": r.id, "user_id": user_id, **op.order.model_dump(include={"symbol", "quantity", "price", "date", "type"})}
+        for op, r in ok if op.op == "create"
+    ]
+    deletes = [op.id for op, _ in ok if op.op == "delete"]
+    # One executemany per distinct set of changed fields
+    updates = {}
+    for op, _ in ok:
+        if op.op == "update":
+            changes = op.changes.model_dump(exclude_none=True)
+            if changes:
+                updates.setdefault(tuple(sorted(changes)), []).append({"order_id": op.id, **{f"new_{k}": v for k, v in changes.items()}})
+
+    orders = Order.__table__
+    if creates:
+        db.execute(insert(orders), creates)
+    for fields, params in updates.items():
+        db.execute(
+            update(orders)
+            .where(orders.c.user_id == user_id, orders.c.id == bindparam("order_id"))
+            .values({field: bindparam(f"new_{field}") for field in fields}),
+            params,
+        )
+    if deletes:
+        db.execute(delete(orders).where(orders.c.user_id == user_id, orders.c.id.in_(deletes)))
+
+    touched = {op.order.symbol for op, _ in ok if op.op == "create"}
+    touched.update(owned[op.id] for op, _ in ok if op.op != "create")
+    snapshots.rebuild_symbols(db, user_id, touched)
+    db.commit()
+    return BatchOut(applied=len(ok), results=results)
+
+# Add order
+@router.post("/orders/add", response_model=OrderOut)
+async def add_order(order_in: OrderCreate, db=Depends(get_async_db), user_id=Depends(get_current_user_id)):
+    return await run_sync(db, _add_order, user_id, order_in)
+
+# List orders for user, newest first: one page per call, next page via the X-Next-Cursor header,
+# or everything as NDJSON with format=ndjson
+@router.get("/orders", response_model=List[OrderOut])
+async def get_orders(
+    response: Response,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    symbol: str | None = None,
+    order_type: Literal["buy", "sell"] | None = Query(None, alias="type"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    format: Literal["json", "ndjson"] = "json",
+    db=Depends(get_async_db),
+    user_id=Depends(get_current_user_id),
+):
+    before = _decode_cursor(cursor) if cursor else None
+    query = order_list_query(user_id, symbol=symbol, order_type=order_type, start=start, end=end, before=before)
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(query), media_type="application/x-ndjson")
+
+    # One extra row tells whether another page exists
+    orders = await run_sync(db, _list_orders, query, limit + 1)
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(orders[-1])
+    return orders
+
+# Update order
+@router.put("/orders/update/{order_id}", response_model=OrderOut)
+async def update_order(order_id: uuid.UUID, order_in: OrderUpdate, db=Depends(get_async_db), user_id=Depends(get_current_user_id)):
+    return await run_sync(db, _update_order, user_id, order_id, order_in)
+
+# Delete order
+@router.delete("/orders/delete/{order_id}", status_code=204)
+async def delete_order(order_id: uuid.UUID, db=Depends(get_async_db), user_id=Depends(get_current_user_id)):
+    await run_sync(db, _delete_order, user_id, order_id)
     return None
 
 @router.delete("/orders/all")
-def delete_all_orders(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    db.query(Order).filter(Order.user_id == current_user.id).delete()
-    db.commit()
-    return {"message": "All orders deleted successfully."} 
\ No newline at end of file
+async def delete_all_orders(db=Depends(get_async_db), user_id=Depends(get_current_user_id)):
+    await run_sync(db, _delete_all_orders, user_id)
+    return {"message": "All orders deleted successfully."}
+
+# Create, update and delete many orders in one call and one transaction. Up to
+# ORDERS_BATCH_MAX_OPERATIONS operations and their snapshot rebuilds are too much
+# work for the event loop thread, so this runs in the threadpool on a sync session.
+@router.post("/orders/batch", response_model=BatchOut)
+async def batch_orders(batch: OrderBatch, response: Response, db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    out = await run_in_threadpool(_apply_batch, db, user_id, batch)
+    if batch.atomic and not out.applied:
+        response.status_code = 409
+    return out
@@ -0,0 +1,81 @@
+from collections import deque
+
+
+def new_position():
+    return {
+        "quantity": 0,
+        "avg_buy_price": 0,
+        "investment": 0,
+        "realized_profit": 0,
+        "buy_lots": deque(),  # [quantity, price, date] in FIFO order
+    }
+
+
+def apply_order(position, order, round_trips=None):
+    """Apply one buy/sell to a position using FIFO lot matching.
+
+    Returns the realized profit of the order. Matched buy/sell pieces are
+    appended to `round_trips` when a list is given.
+    """
+    realized = 0
+    if order.type == "buy":
+        position["quantity"] += order.quantity
+        position["investment"] += order.quantity * order.price
+        position["buy_lots"].append([order.quantity, order.price, order.date])
+    elif order.type == "sell":
+        sell_qty = order.quantity
+        sell_price = order.price
+        buy_lots = position["buy_lots"]
+        while sell_qty > 0 and buy_lots:
+            lot = buy_lots[0]
+            lot_qty, lot_price, lot_date = lot
+            matched = sell_qty if lot_qty > sell_qty else lot_qty
+            realized += (sell_price - lot_price) * matched
+            position["quantity"] -= matched
+            position["investment"] -= matched * lot_price
+            sell_qty -= matched
+            if round_trips is not None:
+                round_trips.append({
+                    "symbol": order.symbol,
+                    "quantity": matched,
+                    "buy_price": lot_price,
+                    "sell_price": sell_price,
+                    "buy_date": lot_date,
+                    "sell_date": order.date,
+                })
+            if matched == lot_qty:
+                buy_lots.popleft()
+            else:
+                lot[0] -= matched
+        # If more sold than held, ignore extra (or could error)
+        position["realized_profit"] += realized
+    position["avg_buy_price"] = (position["investment"] / position["quantity"]) if position["quantity"] else 0
+    return realized
+
+
+def compute_positions(orders, with_round_trips=False):
+    """Replay date-ordered orders into per-symbol positions in a single pass.
+
+    Works with anything exposing symbol, quantity, price, date and type
+    attributes (ORM objects or row tuples). Returns a dict with
+    `holdings` (symbol -> position), total `realized_profit` and, if requested,
+    the FIFO-matched `round_trips`.
+    """
+    holdings = {}
+    realized_profit = 0
+    round_trips = [] if with_round_trips else None
+    for order in orders:
+        position = holdings.get(order.symbol)
+        if position is None:
+            position = holdings[order.symbol] = new_position()
+        realized_profit += apply_order(position, order, round_trips)
+    return {
+        "holdings": holdings,
+        "realized_profit": realized_profit,
+        "round_trips": round_trips or [],
+    }
+
+
+def open_symbols(holdings):
+    """Symbols with a positive open quantity."""
+    return [symbol for symbol, position in holdings.items() if position["quantity"] > 0]
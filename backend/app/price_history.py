@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from .models import DailyPrice, PriceHistoryRange
+from .market_data import fetch_history
+from .providers import HISTORY_COLUMNS
+from .config import PRICE_HISTORY_REFRESH_SECONDS
+
+
+def _upsert_bars(db: Session, bars):
+    if bars.empty:
+        return
+    bars = bars[["symbol", "date", *HISTORY_COLUMNS]].astype({c: float for c in HISTORY_COLUMNS})
+    records = bars.astype(object).where(bars.notna(), None).to_dict("records")
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(DailyPrice.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "date"],
+            set_={c: stmt.excluded[c] for c in HISTORY_COLUMNS},
+        )
+        db.execute(stmt, records)
+    else:
+        for record in records:
+            db.merge(DailyPrice(**record))
+
+
+def _fetch_plan(ranges, symbols, start, end):
+    """Group the missing (from, to) date spans of each symbol so each span is one batched fetch."""
+    refresh_before = datetime.utcnow() - timedelta(seconds=PRICE_HISTORY_REFRESH_SECONDS)
+    plan = defaultdict(list)
+    for symbol in symbols:
+        stored = ranges.get(symbol)
+        if stored is None:
+            plan[(start, end)].append(symbol)
+            continue
+        if start < stored.start_date:
+            plan[(start, stored.start_date - timedelta(days=1))].append(symbol)
+        # The last stored day may have been fetched mid-session, so it is refetched along with newer days
+        if stored.end_date < end or stored.updated_at < refresh_before:
+            plan[(min(stored.end_date, end), end)].append(symbol)
+    return plan
+
+
+def ensure_history(db: Session, symbols, start: date, end: date = None):
+    """Make sure daily_prices covers start..end for every symbol, fetching only what is missing.
+
+    The first call for a symbol downloads its whole range; later calls only
+    extend it (and refresh the latest day at most every PRICE_HISTORY_REFRESH_SECONDS).
+    """
+    end = end or date.today()
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return
+    ranges = {
+        row.symbol: row
+        for row in db.query(PriceHistoryRange).filter(PriceHistoryRange.symbol.in_(symbols))
+    }
+    for (span_start, span_end), batch in _fetch_plan(ranges, symbols, start, end).items():
+        try:
+            bars = fetch_history(batch, span_start, span_end)
+            _upsert_bars(db, bars)
+            now = datetime.utcnow()
+            for symbol in batch:
+                stored = ranges.get(symbol)
+                if stored is None:
+                    stored = ranges[symbol] = PriceHistoryRange(symbol=symbol, start_date=span_start, end_date=span_end)
+                    db.add(stored)
+                stored.start_date = min(stored.start_date, span_start)
+                stored.end_date = max(stored.end_date, span_end)
+                stored.updated_at = now
+            db.commit()
+        except Exception as e:
+            # Another request may have stored the same span first; otherwise this span is retried next time
+            db.rollback()
+            ranges = {
+                row.symbol: row
+                for row in db.query(PriceHistoryRange).filter(PriceHistoryRange.symbol.in_(symbols))
+            }
+            print(f"Error fetching price history for {batch}: {e}")
+
+
+def load_closes(db: Session, symbols, start: date, end: date = None):
+    """Stored daily closes as a frame indexed by date (DatetimeIndex) with one column per symbol."""
+    end = end or date.today()
+    symbols = list(dict.fromkeys(symbols))
+    # Core execution: tens of thousands of rows, and the ORM result layer would dominate
+    rows = db.connection().execute(
+        select(DailyPrice.date, DailyPrice.symbol, DailyPrice.close)
+        .where(DailyPrice.symbol.in_(symbols), DailyPrice.date >= start, DailyPrice.date <= end)
+    ).all()
+    bars = pd.DataFrame.from_records(rows, columns=["date", "symbol", "close"])
+    closes = bars.pivot(index="date", columns="symbol", values="close") if len(bars) else pd.DataFrame()
+    closes.index = pd.DatetimeIndex(closes.index, name="date")
+    return closes.reindex(columns=symbols).astype(float).sort_index()
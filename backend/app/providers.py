@@ -0,0 +1,381 @@
+"""Market data providers: live Yahoo Finance, fixed stub data and an offline SQLite fixture.
+
+Every provider implements MarketDataProvider. The active one is chosen by
+MARKET_DATA_PROVIDER in config.py and used through market_data, which adds
+caching on top.
+"""
+import asyncio
+import sqlite3
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import httpx
+import pandas as pd
+import yfinance as yf
+from starlette.concurrency import run_in_threadpool
+from .config import (
+    QUOTE_BATCH_SIZE,
+    MARKET_DATA_PROVIDER,
+    MARKET_DATA_FIXTURE,
+    MARKET_DATA_CONCURRENCY,
+    MARKET_DATA_MAX_CONNECTIONS,
+    MARKET_DATA_TIMEOUT_SECONDS,
+)
+
+QUOTE_COLUMNS = ["price", "open", "previous_close"]
+HISTORY_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Multi-symbol async lookups block a thread on yf.download; they get their own
+# pool so a slow Yahoo can't starve the threadpool that serves the sync routes
+download_executor = ThreadPoolExecutor(max_workers=MARKET_DATA_CONCURRENCY, thread_name_prefix="market-data")
+
+
+def _empty_quotes(symbols):
+    return pd.DataFrame(index=pd.Index(list(symbols), name="symbol"), columns=QUOTE_COLUMNS, dtype=float)
+
+
+def _empty_history():
+    return pd.DataFrame(columns=["symbol", "date", *HISTORY_COLUMNS])
+
+
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+
+def _parse_chart(payload):
+    """Pull price/open/previous_close out of a Yahoo chart API response."""
+    result = (payload.get("chart", {}).get("result") or [None])[0]
+    if not result:
+        return None
+    bars = result.get("indicators", {}).get("quote", [{}])[0]
+    closes = bars.get("close") or []
+    opens = bars.get("open") or []
+    valid = [i for i, close in enumerate(closes) if close is not None]
+    if not valid:
+        return None
+    last = valid[-1]
+    return {
+        "price": closes[last],
+        "open": opens[last] if last < len(opens) else None,
+        "previous_close": closes[valid[-2]] if len(valid) > 1 else None,
+    }
+
+
+class AsyncYahooClient:
+    """Pooled httpx client for the Yahoo chart API with bounded concurrency."""
+
+    def __init__(self, concurrency: int = MARKET_DATA_CONCURRENCY):
+        self.client = httpx.AsyncClient(
+            timeout=MARKET_DATA_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=MARKET_DATA_MAX_CONNECTIONS, max_keepalive_connections=MARKET_DATA_MAX_CONNECTIONS),
+            headers={"User-Agent": "Mozilla/5.0"},
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_quote(self, symbol):
+        async with self.semaphore:
+            response = await self.client.get(YAHOO_CHART_URL.format(symbol=symbol), params={"range": "5d", "interval": "1d"})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return _parse_chart(response.json())
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class MarketDataProvider(ABC):
+    """Interface for market data sources.
+
+    fetch_quotes returns a quote table: a frame indexed by symbol with
+    QUOTE_COLUMNS, NaN where unknown. fetch_history returns a long frame of
+    symbol, date and HISTORY_COLUMNS. fetch_reference returns
+    {"sector", "market_cap"} for one symbol.
+    """
+
+    @abstractmethod
+    def fetch_quotes(self, symbols):
+        ...
+
+    async def fetch_quotes_async(self, symbols):
+        return await run_in_threadpool(self.fetch_quotes, list(symbols))
+
+    def fetch_quote(self, symbol):
+        return self.fetch_quotes([symbol]).loc[symbol].to_dict()
+
+    @abstractmethod
+    def fetch_reference(self, symbol):
+        ...
+
+    @abstractmethod
+    def fetch_history(self, symbols, start, end):
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Fetches quotes from Yahoo Finance with one multi-ticker download per batch.
+
+    Async lookups of several symbols run that same batched download on
+    download_executor; a single symbol goes to the chart API over a pooled httpx
+    client instead, so it doesn't hold a worker thread on the network.
+    """
+
+    def __init__(self, batch_size: int = QUOTE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._async_client = None
+        self._async_loop = None
+
+    async def _client_for_loop(self):
+        # httpx pools and asyncio semaphores belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            old_client, self._async_client, self._async_loop = self._async_client, AsyncYahooClient(), loop
+            if old_client is not None:
+                try:
+                    await old_client.aclose()
+                except Exception as e:
+                    # Its loop may already be closed; the sockets go with it
+                    print(f"Error closing market data client: {e}")
+        return self._async_client
+
+    async def fetch_quotes_async(self, symbols):
+        table = _empty_quotes(symbols)
+        if len(table.index) != 1:
+            return await asyncio.get_running_loop().run_in_executor(download_executor, self.fetch_quotes, list(table.index))
+        symbol = table.index[0]
+        client = await self._client_for_loop()
+        try:
+            quote = await client.fetch_quote(symbol)
+        except Exception as e:
+            print(f"Error fetching quote for {symbol}: {e}")
+            return table
+        if quote:
+            for column in QUOTE_COLUMNS:
+                if quote.get(column) is not None:
+                    table.at[symbol, column] = float(quote[column])
+        return table
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_loop = None
+
+    def fetch_quotes(self, symbols):
+        table = _empty_quotes(symbols)
+        symbols = list(symbols)
+        for start in range(0, len(symbols), self.batch_size):
+            batch = symbols[start:start + self.batch_size]
+            data = yf.download(batch, period="5d", group_by="column", auto_adjust=False, progress=False, threads=True)
+            if data.empty:
+                continue
+            close = data["Close"].ffill()
+            opens = data["Open"]
+            # A single ticker still comes back keyed by symbol in the column MultiIndex,
+            # but older yfinance versions flatten it.
+            if isinstance(close, pd.Series):
+                close = close.to_frame(batch[0])
+                opens = opens.to_frame(batch[0])
+            for symbol in batch:
+                if symbol not in close.columns:
+                    continue
+                closes = close[symbol].dropna()
+                if closes.empty:
+                    continue
+                table.at[symbol, "price"] = closes.iloc[-1]
+                table.at[symbol, "open"] = opens[symbol].loc[closes.index[-1]]
+                if len(closes) > 1:
+                    table.at[symbol, "previous_close"] = closes.iloc[-2]
+        return table
+
+    def fetch_reference(self, symbol):
+        """Sector and market cap from yfinance (slow: uses ticker.info)."""
+        info = yf.Ticker(symbol).info
+        sector = info.get("sector", "Others")
+        market_cap = info.get("marketCap", None)
+        # Try alternative market cap fields
+        if market_cap is None or market_cap > 1e12:  # If > 1 trillion USD, likely wrong
+            market_cap = info.get("market_cap", None)
+        if market_cap is None or market_cap > 1e12:
+            market_cap = info.get("marketCap", None)
+        return {"sector": sector, "market_cap": market_cap}
+
+    def fetch_history(self, symbols, start, end):
+        """Daily OHLCV bars for start..end (inclusive dates) as a long frame of symbol, date, open, high, low, close, volume."""
+        symbols = list(symbols)
+        frames = []
+        for i in range(0, len(symbols), self.batch_size):
+            batch = symbols[i:i + self.batch_size]
+            data = yf.download(batch, start=start, end=end + timedelta(days=1), interval="1d", group_by="column",
+                               auto_adjust=False, progress=False, threads=True)
+            if data.empty:
+                continue
+            if not isinstance(data.columns, pd.MultiIndex):
+                data.columns = pd.MultiIndex.from_product([data.columns, batch[:1]])
+            bars = data.stack(level=1, future_stack=True).rename_axis(["date", "symbol"]).reset_index()
+            bars.columns = [str(c).lower() for c in bars.columns]
+            frames.append(bars.dropna(subset=["close"])[["symbol", "date", *HISTORY_COLUMNS]])
+        if not frames:
+            return _empty_history()
+        history = pd.concat(frames, ignore_index=True)
+        history["date"] = pd.to_datetime(history["date"]).dt.date
+        return history
+
+
+class StubProvider(MarketDataProvider):
+    """Offline provider serving fixed quotes, for tests and local runs.
+
+    `quotes` maps symbol -> price, or symbol -> dict with price/open/previous_close.
+    """
+
+    def __init__(self, quotes=None, history=None, reference=None):
+        self.quotes = dict(quotes or {})
+        self.history = dict(history or {})  # symbol -> pd.Series of daily closes indexed by date
+        self.reference = dict(reference or {})  # symbol -> {"sector", "market_cap"}
+        self.calls = 0
+
+    def fetch_quotes(self, symbols):
+        self.calls += 1
+        table = _empty_quotes(symbols)
+        for symbol in table.index:
+            quote = self.quotes.get(symbol)
+            if quote is None:
+                continue
+            if not isinstance(quote, dict):
+                quote = {"price": quote, "open": quote}
+            for column in QUOTE_COLUMNS:
+                if quote.get(column) is not None:
+                    table.at[symbol, column] = float(quote[column])
+        return table
+
+    async def fetch_quotes_async(self, symbols):
+        return self.fetch_quotes(symbols)
+
+    def fetch_reference(self, symbol):
+        return self.reference.get(symbol, {"sector": "Others", "market_cap": None})
+
+    def fetch_history(self, symbols, start, end):
+        self.calls += 1
+        frames = []
+        for symbol in symbols:
+            closes = self.history.get(symbol)
+            if closes is None:
+                continue
+            closes = closes[(closes.index >= start) & (closes.index <= end)]
+            frames.append(pd.DataFrame({
+                "symbol": symbol, "date": list(closes.index),
+                "open": closes.values, "high": closes.values, "low": closes.values, "close": closes.values, "volume": 0.0,
+            }))
+        return pd.concat(frames, ignore_index=True) if frames else _empty_history()
+
+
+FIXTURE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (symbol TEXT PRIMARY KEY, price REAL, open REAL, previous_close REAL);
+CREATE TABLE IF NOT EXISTS reference (symbol TEXT PRIMARY KEY, sector TEXT, market_cap REAL);
+CREATE TABLE IF NOT EXISTS history (
+    symbol TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, date)
+);
+"""
+
+
+class FixtureProvider(MarketDataProvider):
+    """Offline provider reading quotes, reference data and daily bars from a SQLite fixture file.
+
+    Deterministic and network-free, for benchmarks, load tests and local
+    development. Build a fixture with write_fixture(); unknown symbols have no
+    quote and "Others" reference data, just like an unknown ticker upstream.
+    """
+
+    def __init__(self, path=MARKET_DATA_FIXTURE):
+        self.path = path
+
+    def _query(self, sql, params):
+        # A connection per call keeps the provider safe to use from any thread
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _placeholders(values):
+        return ",".join("?" * len(values))
+
+    def fetch_quotes(self, symbols):
+        table = _empty_quotes(symbols)
+        symbols = list(table.index)
+        if not symbols:
+            return table
+        rows = self._query(
+            f"SELECT symbol, price, open, previous_close FROM quotes WHERE symbol IN ({self._placeholders(symbols)})",
+            symbols,
+        )
+        for symbol, *values in rows:
+            table.loc[symbol, QUOTE_COLUMNS] = [float("nan") if v is None else v for v in values]
+        return table
+
+    def fetch_reference(self, symbol):
+        rows = self._query("SELECT sector, market_cap FROM reference WHERE symbol = ?", [symbol])
+        if not rows:
+            return {"sector": "Others", "market_cap": None}
+        sector, market_cap = rows[0]
+        return {"sector": sector or "Others", "market_cap": market_cap}
+
+    def fetch_history(self, symbols, start, end):
+        symbols = list(symbols)
+        if not symbols:
+            return _empty_history()
+        rows = self._query(
+            f"SELECT symbol, date, {', '.join(HISTORY_COLUMNS)} FROM history"
+            f" WHERE symbol IN ({self._placeholders(symbols)}) AND date >= ? AND date <= ? ORDER BY symbol, date",
+            [*symbols, start.isoformat(), end.isoformat()],
+        )
+        if not rows:
+            return _empty_history()
+        history = pd.DataFrame(rows, columns=["symbol", "date", *HISTORY_COLUMNS])
+        history["date"] = pd.to_datetime(history["date"]).dt.date
+        return history
+
+
+def write_fixture(path, quotes=None, reference=None, history=None):
+    """Create or extend a FixtureProvider file.
+
+    `quotes`: symbol -> price or dict with price/open/previous_close.
+    `reference`: symbol -> {"sector", "market_cap"}.
+    `history`: a long frame of symbol, date and HISTORY_COLUMNS (missing columns are taken from close).
+    """
+    with sqlite3.connect(path) as conn:
+        conn.executescript(FIXTURE_SCHEMA)
+        for symbol, quote in (quotes or {}).items():
+            if not isinstance(quote, dict):
+                quote = {"price": quote, "open": quote}
+            conn.execute(
+                "INSERT OR REPLACE INTO quotes VALUES (?, ?, ?, ?)",
+                [symbol, *(quote.get(column) for column in QUOTE_COLUMNS)],
+            )
+        for symbol, ref in (reference or {}).items():
+            conn.execute("INSERT OR REPLACE INTO reference VALUES (?, ?, ?)", [symbol, ref.get("sector"), ref.get("market_cap")])
+        if history is not None and len(history):
+            bars = history.copy()
+            for column in HISTORY_COLUMNS:
+                if column not in bars:
+                    bars[column] = 0.0 if column == "volume" else bars["close"]
+            bars["date"] = pd.to_datetime(bars["date"]).dt.strftime("%Y-%m-%d")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO history VALUES (?, ?, {', '.join('?' * len(HISTORY_COLUMNS))})",
+                bars[["symbol", "date", *HISTORY_COLUMNS]].itertuples(index=False, name=None),
+            )
+
+
+PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "fixture": FixtureProvider,
+    "stub": StubProvider,
+}
+
+
+def create_provider(name=MARKET_DATA_PROVIDER):
+    """Instantiate the provider named in config (MARKET_DATA_PROVIDER)."""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown MARKET_DATA_PROVIDER {name!r}; expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
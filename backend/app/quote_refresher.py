@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+from starlette.concurrency import run_in_threadpool
+from .database import SessionLocal
+from .models import PositionSnapshot
+from .market_data import quote_cache
+from .config import (
+    QUOTE_TTL_SECONDS,
+    QUOTE_BATCH_SIZE,
+    QUOTE_REFRESH_ENABLED,
+    QUOTE_REFRESH_SECONDS,
+    QUOTE_REFRESH_CLOSED_SECONDS,
+    QUOTE_REFRESH_BACKOFF_SECONDS,
+    QUOTE_REFRESH_MAX_BACKOFF_SECONDS,
+    MARKET_TIMEZONE,
+    MARKET_OPEN,
+    MARKET_CLOSE,
+)
+
+MARKET_TZ = ZoneInfo(MARKET_TIMEZONE)
+OPEN_TIME = time.fromisoformat(MARKET_OPEN)
+CLOSE_TIME = time.fromisoformat(MARKET_CLOSE)
+
+_task = None
+
+
+def market_is_open(now=None):
+    now = now or datetime.now(MARKET_TZ)
+    return now.weekday() < 5 and OPEN_TIME <= now.time() < CLOSE_TIME
+
+
+def seconds_until_open(now=None):
+    now = now or datetime.now(MARKET_TZ)
+    day = now.date()
+    if now.time() >= OPEN_TIME:
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return (datetime.combine(day, OPEN_TIME, tzinfo=MARKET_TZ) - now).total_seconds()
+
+
+def next_refresh_delay(now=None):
+    """Seconds until the next refresh: frequent in session, otherwise sparse but never past the next open."""
+    now = now or datetime.now(MARKET_TZ)
+    if market_is_open(now):
+        return QUOTE_REFRESH_SECONDS
+    return max(1, min(QUOTE_REFRESH_CLOSED_SECONDS, seconds_until_open(now)))
+
+
+def open_symbol_universe():
+    """Distinct symbols with an open position across all users (read from the position snapshots)."""
+    db = SessionLocal()
+    try:
+        return [s for (s,) in db.query(PositionSnapshot.symbol).filter(PositionSnapshot.quantity > 0).distinct()]
+    finally:
+        db.close()
+
+
+async def refresh_universe(ttl):
+    """Fetch quotes for the whole universe in batches into the shared quote cache. Returns the symbol count."""
+    symbols = await run_in_threadpool(open_symbol_universe)
+    priced = 0
+    for start in range(0, len(symbols), QUOTE_BATCH_SIZE):
+        table = await quote_cache.provider.fetch_quotes_async(symbols[start:start + QUOTE_BATCH_SIZE])
+        quote_cache.put_many(table, ttl)
+        priced += int(table["price"].notna().sum())
+    if symbols and not priced:
+        raise RuntimeError(f"no quotes returned for {len(symbols)} symbols")
+    return len(symbols)
+
+
+async def run_quote_refresher():
+    """Refresh loop: cached quotes stay valid until just after the next refresh, so requests never wait on Yahoo."""
+    failures = 0
+    while True:
+        delay = next_refresh_delay()
+        try:
+            await refresh_universe(ttl=delay + QUOTE_TTL_SECONDS)
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            failures += 1
+            delay = min(QUOTE_REFRESH_BACKOFF_SECONDS * 2 ** (failures - 1), QUOTE_REFRESH_MAX_BACKOFF_SECONDS)
+            print(f"Error refreshing quotes (retry {failures} in {delay}s): {e}")
+        await asyncio.sleep(delay)
+
+
+def start_quote_refresher():
+    global _task
+    if QUOTE_REFRESH_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(run_quote_refresher())
+
+
+async def stop_quote_refresher():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import Instrument
+from .market_data import get_provider
+from .config import REFERENCE_REFRESH_SECONDS, REFERENCE_FAILURE_TTL_SECONDS
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+# Negative cache: symbol -> time.monotonic() until which a failed lookup is not retried
+_failed = {}
+_failed_lock = threading.Lock()
+
+
+def _recently_failed(symbol):
+    with _failed_lock:
+        until = _failed.get(symbol)
+        if until is not None and until <= time.monotonic():
+            del _failed[symbol]
+            until = None
+        return until is not None
+
+
+def _remember_failure(symbol):
+    now = time.monotonic()
+    with _failed_lock:
+        for expired in [s for s, until in _failed.items() if until <= now]:
+            del _failed[expired]
+        _failed[symbol] = now + REFERENCE_FAILURE_TTL_SECONDS
+
+
+def fetch_reference(symbol: str) -> dict:
+    """Fetch sector and market cap for a symbol from the market data provider (slow upstream)."""
+    return get_provider().fetch_reference(symbol)
+
+
+def _save(db: Session, symbol: str, reference: dict):
+    db.merge(Instrument(
+        symbol=symbol,
+        sector=reference["sector"],
+        market_cap=reference["market_cap"],
+        updated_at=datetime.utcnow(),
+    ))
+
+
+def _refresh(symbols):
+    db = SessionLocal()
+    try:
+        for symbol in symbols:
+            try:
+                _save(db, symbol, fetch_reference(symbol))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"Error refreshing reference data for {symbol}: {e}")
+    finally:
+        db.close()
+        with _refreshing_lock:
+            _refreshing.difference_update(symbols)
+
+
+def refresh_in_background(symbols):
+    """Refresh reference rows on a daemon thread, skipping symbols already being refreshed."""
+    with _refreshing_lock:
+        symbols = [s for s in symbols if s not in _refreshing]
+        _refreshing.update(symbols)
+    if symbols:
+        threading.Thread(target=_refresh, args=(symbols,), daemon=True).start()
+
+
+def get_reference_data(db: Session, symbols) -> dict:
+    """Return {symbol: {"sector", "market_cap"}} from the instruments table.
+
+    Unknown symbols are fetched once and stored. Rows older than
+    REFERENCE_REFRESH_SECONDS are served as-is and refreshed in the background,
+    so steady-state calls make no network requests. A failed lookup (unknown
+    or delisted symbol) is not retried for REFERENCE_FAILURE_TTL_SECONDS.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    rows = db.query(Instrument).filter(Instrument.symbol.in_(symbols)).all()
+    reference = {row.symbol: {"sector": row.sector, "market_cap": row.market_cap} for row in rows}
+
+    stale_before = datetime.utcnow() - timedelta(seconds=REFERENCE_REFRESH_SECONDS)
+    stale = [row.symbol for row in rows if row.updated_at < stale_before]
+    if stale:
+        refresh_in_background(stale)
+
+    missing = []
+    for symbol in symbols:
+        if symbol in reference:
+            continue
+        if _recently_failed(symbol):
+            reference[symbol] = {"sector": "Others", "market_cap": None}
+        else:
+            missing.append(symbol)
+    for symbol in missing:
+        try:
+            reference[symbol] = fetch_reference(symbol)
+            _save(db, symbol, reference[symbol])
+        except Exception as e:
+            print(f"Error fetching reference data for {symbol}: {e}")
+            _remember_failure(symbol)
+            reference[symbol] = {"sector": "Others", "market_cap": None}
+    if missing:
+        try:
+            db.commit()
+        except Exception:
+            # Another request stored the same symbol first; its row is just as good.
+            db.rollback()
+    return reference
@@ -0,0 +1,167 @@
+import math
+import threading
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .auth import get_current_user_id, get_db
+from .models import PositionSnapshot
+from .analytics import holding_changes
+from .history import load_history_inputs, daily_holdings
+from .config import RISK_FREE_RATE, RISK_BENCHMARK, RISK_CACHE_SIZE
+
+router = APIRouter()
+
+TRADING_DAYS = 252
+
+EMPTY_RISK = {
+    "annualized_return": None,
+    "annualized_volatility": None,
+    "max_drawdown": None,
+    "sharpe_ratio": None,
+    "sortino_ratio": None,
+    "beta": None,
+    "xirr": None,
+    "trading_days": 0,
+}
+
+# (user_id, day, snapshot version) -> metrics; any order change bumps the snapshot version
+_risk_cache = OrderedDict()
+_risk_cache_lock = threading.Lock()
+
+
+def risk_cache_key(db: Session, user_id):
+    """Cheap fingerprint of a user's orders: latest snapshot update and snapshot count, plus today's date."""
+    updated_at, count = db.query(func.max(PositionSnapshot.updated_at), func.count()).filter(
+        PositionSnapshot.user_id == user_id
+    ).one()
+    return (str(user_id), date.today().isoformat(), updated_at, count)
+
+
+def get_cached_risk(key):
+    with _risk_cache_lock:
+        risk = _risk_cache.get(key)
+        if risk is not None:
+            _risk_cache.move_to_end(key)
+        return risk
+
+
+def cache_risk(key, risk):
+    with _risk_cache_lock:
+        _risk_cache[key] = risk
+        _risk_cache.move_to_end(key)
+        while len(_risk_cache) > RISK_CACHE_SIZE:
+            _risk_cache.popitem(last=False)
+
+
+def compute_risk(db: Session, user_id):
+    orders, closes = load_history_inputs(db, user_id, extra_symbols=[RISK_BENCHMARK])
+    benchmark = closes[RISK_BENCHMARK] if RISK_BENCHMARK in closes else None
+    return build_risk(orders, closes, benchmark)
+
+
+@router.get("/portfolio/risk")
+async def get_risk_metrics(db: Session = Depends(get_db), user_id=Depends(get_current_user_id)):
+    """Volatility, drawdown, Sharpe/Sortino, beta vs the benchmark index and XIRR, memoized per user and day."""
+    key = await run_in_threadpool(risk_cache_key, db, user_id)
+    risk = get_cached_risk(key)
+    if risk is None:
+        risk = await run_in_threadpool(compute_risk, db, user_id)
+        cache_risk(key, risk)
+    return risk
+
+
+def daily_returns(quantities, prices, trading_days):
+    """Time-weighted daily portfolio returns from date x symbol holdings and prices.
+
+    Each day's return is the asset return matrix weighted by the previous
+    day's holding values, so buying or selling never shows up as a return.
+    """
+    asset_returns = prices.pct_change(fill_method=None)
+    weights = (quantities * prices).shift(1)
+    base = weights.sum(axis=1)
+    returns = (weights * asset_returns).sum(axis=1) / base
+    returns = returns[base > 0]
+    if len(trading_days):
+        returns = returns[returns.index.isin(trading_days)]
+    return returns
+
+
+def xirr(amounts, days):
+    """Money-weighted annual return of dated cash flows (negative = money in), or None if undefined."""
+    amounts = np.asarray(amounts, dtype=float)
+    years = np.asarray((days - days[0]).days, dtype=float) / 365.0
+    if not ((amounts > 0).any() and (amounts < 0).any()):
+        return None
+
+    def npv(rates):
+        return (amounts[None, :] / (1 + rates[:, None]) ** years[None, :]).sum(axis=1)
+
+    # Bracket the root on a grid of rates (all evaluated at once), then bisect
+    grid = np.concatenate([np.linspace(-0.99, 1, 200), np.geomspace(1, 100, 60)[1:]])
+    with np.errstate(over="ignore", invalid="ignore"):
+        values = npv(grid)
+    sign_change = np.flatnonzero(np.sign(values[:-1]) * np.sign(values[1:]) < 0)
+    if not len(sign_change):
+        return None
+    low, high = grid[sign_change[0]], grid[sign_change[0] + 1]
+    low_value = values[sign_change[0]]
+    for _ in range(100):
+        mid = (low + high) / 2
+        mid_value = npv(np.array([mid]))[0]
+        if np.sign(mid_value) == np.sign(low_value):
+            low, low_value = mid, mid_value
+        else:
+            high = mid
+    return (low + high) / 2
+
+
+def _pct(value):
+    return None if value is None or not math.isfinite(value) else round(float(value) * 100, 2)
+
+
+def _ratio(value):
+    return None if value is None or not math.isfinite(value) else round(float(value), 2)
+
+
+def build_risk(orders, closes, benchmark=None):
+    """Risk metrics from an order frame, daily closes and optional benchmark closes (Series by date)."""
+    if orders.empty:
+        return dict(EMPTY_RISK)
+    calendar, quantities, prices, _ = daily_holdings(orders, closes)
+    returns = daily_returns(quantities, prices, closes.index)
+
+    # Money-weighted return: order cash flows plus today's value as if sold
+    changes = holding_changes(orders)
+    flows = (-changes["cash"]).groupby(orders["date"].dt.normalize()).sum()
+    final_value = float((quantities.iloc[-1] * prices.iloc[-1]).sum())
+    flows = flows.add(pd.Series({calendar[-1]: final_value}), fill_value=0.0)
+    money_weighted = xirr(flows.to_numpy(), flows.index)
+
+    risk = dict(EMPTY_RISK)
+    risk["xirr"] = _pct(money_weighted)
+    risk["trading_days"] = len(returns)
+    if len(returns) < 2:
+        return risk
+
+    volatility = returns.std() * math.sqrt(TRADING_DAYS)
+    wealth = (1 + returns).cumprod()
+    excess = returns - RISK_FREE_RATE / TRADING_DAYS
+    downside = math.sqrt((np.minimum(excess, 0) ** 2).mean()) * math.sqrt(TRADING_DAYS)
+    risk["annualized_return"] = _pct(wealth.iloc[-1] ** (TRADING_DAYS / len(returns)) - 1)
+    risk["annualized_volatility"] = _pct(volatility)
+    risk["max_drawdown"] = _pct((wealth / wealth.cummax() - 1).min())
+    risk["sharpe_ratio"] = _ratio(excess.mean() * TRADING_DAYS / volatility) if volatility else None
+    risk["sortino_ratio"] = _ratio(excess.mean() * TRADING_DAYS / downside) if downside else None
+
+    if benchmark is not None:
+        market = benchmark.dropna().pct_change().dropna()
+        aligned = pd.concat([returns, market], axis=1, join="inner").dropna()
+        if len(aligned) >= 2:
+            variance = aligned.iloc[:, 1].var()
+            risk["beta"] = _ratio(aligned.iloc[:, 0].cov(aligned.iloc[:, 1]) / variance) if variance else None
+    return risk
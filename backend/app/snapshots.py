@@ -0,0 +1,183 @@
+from collections import deque
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import Order, PositionSnapshot
+from .positions import new_position, apply_order, compute_positions
+from .order_queries import load_orders, load_order_frame
+from .analytics import fifo_positions
+
+
+def _to_position(row: PositionSnapshot, with_lots=True):
+    position = new_position()
+    position["quantity"] = row.quantity
+    position["investment"] = row.investment
+    position["realized_profit"] = row.realized_profit
+    if with_lots:
+        position["buy_lots"] = deque(
+            [quantity, price, datetime.fromisoformat(date) if date else None]
+            for quantity, price, date in row.buy_lots
+        )
+    position["avg_buy_price"] = (row.investment / row.quantity) if row.quantity else 0
+    return position
+
+
+def _write(row: PositionSnapshot, position, last_order_date):
+    row.quantity = position["quantity"]
+    row.investment = position["investment"]
+    row.realized_profit = position["realized_profit"]
+    row.buy_lots = [
+        [quantity, price, date.isoformat() if date else None]
+        for quantity, price, date in position["buy_lots"]
+    ]
+    row.last_order_date = last_order_date
+    row.updated_at = datetime.utcnow()
+
+
+def _unsnapshotted_symbols(db: Session, user_id):
+    """Symbols the user has orders in but no snapshot row for (orders that predate the snapshot table)."""
+    have = {s for (s,) in db.query(PositionSnapshot.symbol).filter(PositionSnapshot.user_id == user_id)}
+    return {s for (s,) in db.query(Order.symbol).filter(Order.user_id == user_id).distinct()} - have
+
+
+def lock_snapshots(db: Session, user_id, symbols):
+    """Lock the user's snapshot rows for `symbols` until commit and return them freshly loaded, by symbol.
+
+    Missing rows are first inserted as empty placeholders (last_order_date
+    None) with on-conflict-do-nothing, so there is always a row to lock and
+    concurrent writers never collide on the insert. PostgreSQL then locks the
+    rows with SELECT ... FOR UPDATE in symbol order; on SQLite the insert
+    already took the database write lock. Every snapshot write goes through
+    here, so read-modify-write updates of one position never interleave.
+
+    The user's other symbols without a snapshot row are backfilled first, so
+    a write to one symbol never leaves the rest of an older history unsnapshotted.
+    """
+    symbols = set(symbols)
+    if not symbols:
+        return {}
+    backfill = _unsnapshotted_symbols(db, user_id) - symbols
+    rows = _lock_rows(db, user_id, symbols | backfill)
+    if backfill:
+        _replay_into(db, user_id, backfill, rows)
+    return rows
+
+
+def _lock_rows(db: Session, user_id, symbols):
+    symbols = sorted(symbols)
+    now = datetime.utcnow()
+    placeholders = [
+        {"user_id": user_id, "symbol": symbol, "quantity": 0.0, "investment": 0.0, "realized_profit": 0.0,
+         "buy_lots": [], "last_order_date": None, "updated_at": now}
+        for symbol in symbols
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(PositionSnapshot.__table__)
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["user_id", "symbol"]), placeholders)
+    else:
+        existing = {s for (s,) in db.query(PositionSnapshot.symbol).filter(
+            PositionSnapshot.user_id == user_id, PositionSnapshot.symbol.in_(symbols))}
+        missing = [p for p in placeholders if p["symbol"] not in existing]
+        if missing:
+            db.execute(insert(PositionSnapshot.__table__), missing)
+    rows = (
+        db.query(PositionSnapshot)
+        .filter(PositionSnapshot.user_id == user_id, PositionSnapshot.symbol.in_(symbols))
+        .order_by(PositionSnapshot.symbol)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    return {row.symbol: row for row in rows}
+
+
+def rebuild_symbol(db: Session, user_id, symbol: str):
+    """Replay one symbol's orders into its snapshot row (removing the row if no orders are left)."""
+    db.flush()
+    row = lock_snapshots(db, user_id, [symbol])[symbol]
+    orders = load_orders(db, user_id, symbol)
+    if not orders:
+        db.delete(row)
+        return
+    position = compute_positions(orders)["holdings"][symbol]
+    _write(row, position, orders[-1].date)
+
+
+def rebuild_symbols(db: Session, user_id, symbols):
+    """rebuild_symbol for many symbols at once, with one order query and the vectorized FIFO kernel."""
+    symbols = set(symbols)
+    if not symbols:
+        return
+    db.flush()
+    _replay_into(db, user_id, symbols, lock_snapshots(db, user_id, symbols))
+
+
+def _replay_into(db: Session, user_id, symbols, rows):
+    """Replay `symbols` with the vectorized FIFO kernel into their locked rows (from lock_snapshots)."""
+    positions, lots = fifo_positions(load_order_frame(db, user_id, symbols), with_lots=True)
+    lots_by_symbol = {
+        symbol: list(zip(group["quantity"].tolist(), group["price"].tolist(), group["date"].dt.to_pydatetime()))
+        for symbol, group in lots.groupby("symbol", sort=False)
+    }
+    for symbol in symbols:
+        row = rows[symbol]
+        if symbol not in positions.index:
+            db.delete(row)
+            continue
+        p = positions.loc[symbol]
+        position = {
+            "quantity": float(p["quantity"]),
+            "investment": float(p["investment"]),
+            "realized_profit": float(p["realized_profit"]),
+            "buy_lots": lots_by_symbol.get(symbol, []),
+        }
+        _write(row, position, p["last_order_date"].to_pydatetime())
+
+
+def record_new_order(db: Session, order: Order):
+    """Update the snapshot for a newly added order.
+
+    Orders dated after the snapshot's last order are applied on top of the
+    stored lots, under the row lock. New symbols, back-dated orders and orders
+    sharing the last order's timestamp replay just that symbol, so both paths
+    always agree with the (date, seq, id) replay order.
+    """
+    row = lock_snapshots(db, order.user_id, [order.symbol])[order.symbol]
+    if row.last_order_date is None or order.date <= row.last_order_date:
+        rebuild_symbol(db, order.user_id, order.symbol)
+        return
+    position = _to_position(row)
+    apply_order(position, order)
+    _write(row, position, order.date)
+
+
+def clear_user(db: Session, user_id):
+    db.query(PositionSnapshot).filter(PositionSnapshot.user_id == user_id).delete()
+
+
+def get_positions(db: Session, user_id):
+    """Return {"holdings": symbol -> position, "realized_profit": total} from the snapshot table.
+
+    Open lots are not decoded (buy_lots is left empty); reads only need the totals.
+    Symbols whose orders predate the snapshot table are backfilled on first
+    read (or first write, see lock_snapshots); concurrent backfills serialize
+    on the snapshot row locks.
+    """
+    missing = _unsnapshotted_symbols(db, user_id)
+    if missing:
+        try:
+            rebuild_symbols(db, user_id, missing)
+            db.commit()
+        except IntegrityError:
+            # Only reachable on databases without on-conflict inserts: another request backfilled first
+            db.rollback()
+    rows = db.query(PositionSnapshot).filter(PositionSnapshot.user_id == user_id).order_by(PositionSnapshot.symbol).all()
+    holdings = {row.symbol: _to_position(row, with_lots=False) for row in rows}
+    return {
+        "holdings": holdings,
+        "realized_profit": sum(p["realized_profit"] for p in holdings.values()),
+    }
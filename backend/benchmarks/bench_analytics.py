@@ -0,0 +1,125 @@
+"""Benchmark the vectorized analytics kernel against the per-order Python engine.
+
+For 1k, 10k and 100k synthetic orders, times FIFO position replay
+(positions.compute_positions vs analytics.fifo_positions) and holding
+valuation (a per-holding loop, as the endpoints used to do, vs
+analytics.value_holdings), and checks both paths give the same numbers.
+No database or network is needed. value_holdings itself loops up to
+analytics.VALUE_LOOP_MAX_HOLDINGS holdings; time its column path with
+--symbols above that.
+
+    python benchmarks/bench_analytics.py --sizes 1000 10000 100000 --symbols 500
+    python benchmarks/bench_analytics.py --sizes 100000 --symbols 5000
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from app.analytics import fifo_positions, holdings_frame, value_holdings
+from app.market_data import QUOTE_COLUMNS
+from app.positions import compute_positions
+
+OrderRow = namedtuple("OrderRow", ["id", "symbol", "quantity", "price", "date", "type"])
+
+
+def synthetic_orders(n, symbols, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    return [
+        OrderRow(i, f"SYM{rng.randrange(symbols)}.NS", float(rng.randint(1, 100)), float(rng.randint(10, 5000)),
+                 start + timedelta(minutes=i), "buy" if rng.random() < 0.6 else "sell")
+        for i in range(n)
+    ]
+
+
+def synthetic_quotes(symbols, seed=0):
+    rng = random.Random(seed)
+    table = pd.DataFrame(index=pd.Index(symbols, name="symbol"), columns=QUOTE_COLUMNS, dtype=float)
+    for symbol in symbols:
+        if rng.random() < 0.95:  # leave a few symbols unpriced
+            price = float(rng.randint(10, 5000))
+            table.loc[symbol] = [price, price * 0.99, price * 1.01]
+    return table
+
+
+def value_loop(holdings, quotes):
+    """The per-holding valuation loop the analysis endpoint used before the kernel."""
+    out = {}
+    for symbol, h in holdings.items():
+        if h["quantity"] <= 0:
+            continue
+        price = quotes.at[symbol, "price"]
+        market_price = None if math.isnan(price) else float(price)
+        investment = h["quantity"] * h["avg_buy_price"]
+        current_value = h["quantity"] * (market_price if market_price is not None else 0)
+        out[symbol] = (investment, current_value, current_value - investment)
+    return out
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def check_positions(engine, kernel, lots):
+    engine_holdings = engine["holdings"]
+    assert list(kernel.index) == list(engine_holdings), "symbol order differs"
+    for symbol, p in engine_holdings.items():
+        k = kernel.loc[symbol]
+        for field in ("quantity", "investment", "realized_profit", "avg_buy_price"):
+            assert math.isclose(p[field], k[field], rel_tol=1e-9, abs_tol=1e-6), (symbol, field, p[field], k[field])
+        engine_lots = [(q, price) for q, price, _ in p["buy_lots"]]
+        kernel_lots = list(zip(*(lots.loc[lots["symbol"] == symbol, c].tolist() for c in ("quantity", "price"))))
+        assert np.allclose(engine_lots, kernel_lots) if engine_lots else not kernel_lots, symbol
+    assert math.isclose(engine["realized_profit"], kernel["realized_profit"].sum(), rel_tol=1e-9, abs_tol=1e-6)
+
+
+def check_values(loop, kernel):
+    assert set(loop) == set(kernel.index)
+    for symbol, (investment, current_value, unrealized) in loop.items():
+        k = kernel.loc[symbol]
+        assert np.allclose([investment, current_value, unrealized], [k["investment"], k["current_value"], k["unrealized_profit"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'orders':>8} | {'fifo loop':>10} | {'fifo kernel':>11} | {'speedup':>7} | {'value loop':>10} | {'value kernel':>12} | {'speedup':>7}")
+    for size in args.sizes:
+        orders = synthetic_orders(size, args.symbols)
+        frame = pd.DataFrame.from_records(orders, columns=OrderRow._fields)
+
+        loop_time, engine = timed(lambda: compute_positions(orders), args.repeat)
+        kernel_time, (kernel, lots) = timed(lambda: fifo_positions(frame, with_lots=True), args.repeat)
+        check_positions(engine, kernel, lots)
+
+        holdings = engine["holdings"]
+        quotes = synthetic_quotes(list(holdings))
+        value_loop_time, looped = timed(lambda: value_loop(holdings, quotes), args.repeat)
+        value_kernel_time, valued = timed(lambda: value_holdings(holdings_frame(holdings), quotes), args.repeat)
+        check_values(looped, valued)
+
+        print(f"{size:>8} | {loop_time * 1000:>8.1f}ms | {kernel_time * 1000:>9.1f}ms | {loop_time / kernel_time:>6.1f}x"
+              f" | {value_loop_time * 1000:>8.1f}ms | {value_kernel_time * 1000:>10.1f}ms | {value_loop_time / value_kernel_time:>6.1f}x")
+    print("kernel results match the Python engine")
+
+
+if __name__ == "__main__":
+    main()
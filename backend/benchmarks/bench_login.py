@@ -0,0 +1,135 @@
+"""Login throughput and its effect on other requests, at several concurrency levels.
+
+Seeds one user in a temporary SQLite database and drives POST /login
+in-process over httpx. At each concurrency level it reports logins/s,
+p50/p95 login latency and how many logins were turned away with 503 by the
+hashing pool's admission control. A probe keeps calling GET /ping during
+the burst. Its p95 shows whether bcrypt work stalls unrelated requests.
+
+    python benchmarks/bench_login.py --concurrency 1 4 16 64 --rounds 12
+    PASSWORD_HASH_WORKERS=4 PASSWORD_HASH_MAX_PENDING=32 python benchmarks/bench_login.py
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+def configure_environment(args, workdir):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench_login.db')}"
+    os.environ["ASYNC_DATABASE_URL"] = "off"
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["QUOTE_REFRESH_ENABLED"] = "false"
+    os.environ.setdefault("JWT_SECRET_KEY", "bench-login-secret")
+    os.environ.setdefault("GROQ_API_KEY", "unused")
+
+
+def seed_user():
+    from app.database import Base, engine, SessionLocal
+    from app.models import User
+    from app.password_hashing import pwd_context
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add(User(id=uuid.uuid4(), email=EMAIL, hashed_password=pwd_context.hash(PASSWORD), created_at=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))] if values else float("nan")
+
+
+async def run_level(client, concurrency, requests):
+    logins = []
+    rejected = 0
+    failed = 0
+    probes = []
+    remaining = requests
+    done = asyncio.Event()
+
+    async def worker():
+        nonlocal remaining, rejected, failed
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.post("/login", json={"email": EMAIL, "password": PASSWORD})
+            if response.status_code == 200:
+                logins.append((time.perf_counter() - started) * 1000)
+            elif response.status_code == 503:
+                rejected += 1
+                await asyncio.sleep(0.05)
+            else:
+                failed += 1
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/ping")
+            probes.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.01)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+    return {
+        "logins_per_s": len(logins) / elapsed,
+        "p50_ms": statistics.median(logins) if logins else float("nan"),
+        "p95_ms": percentile(logins, 95),
+        "rejected": rejected,
+        "failed": failed,
+        "probe_p95_ms": percentile(probes, 95),
+    }
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        # Warm-up: starts the hashing worker processes
+        await client.post("/login", json={"email": EMAIL, "password": PASSWORD})
+        print(f"{'concurrency':>11} | {'logins/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'503s':>5} | {'errors':>6} | {'/ping p95 ms':>12}")
+        for concurrency in args.concurrency:
+            r = await run_level(client, concurrency, max(args.requests, concurrency))
+            print(f"{concurrency:>11} | {r['logins_per_s']:>8.1f} | {r['p50_ms']:>8.0f} | {r['p95_ms']:>8.0f} | {r['rejected']:>5}"
+                  f" | {r['failed']:>6} | {r['probe_p95_ms']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="successful or rejected logins per level")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    args = parser.parse_args()
+
+    configure_environment(args, tempfile.mkdtemp(prefix="portfolio-bench-login-"))
+    seed_user()
+    asyncio.run(run(args))
+
+    from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+    from app.password_hashing import shutdown_password_pool
+
+    shutdown_password_pool()
+    print(f"bcrypt rounds {args.rounds}, {PASSWORD_HASH_WORKERS} hashing workers, at most {PASSWORD_HASH_MAX_PENDING} pending")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""In-process load test for the main API endpoints.
+
+For each scale (total orders), seeds synthetic users and orders into a
+scratch database, then drives the FastAPI app in-process over httpx with
+the offline fixture market data provider and reports throughput and
+p50/p95/p99 latency for:
+
+    GET  /portfolio/analysis, /portfolio/composition, /portfolio/performance,
+         /portfolio/behavior, /orders
+    POST /import
+
+/import only queues a background job, so each import is timed end to end:
+from the upload until polling /import/jobs/{id} shows it done or failed.
+Its row throughput (imported rows per second of wall time) is reported too.
+
+Results can be saved as a baseline and later runs compared against it; the
+script exits non-zero when an endpoint's p95 regresses by more than the
+tolerance.
+
+    python benchmarks/load_test.py --scales 100 10000 1000000 --save-baseline benchmarks/baseline.json
+    python benchmarks/load_test.py --scales 100 10000 --baseline benchmarks/baseline.json
+
+The default database is a temporary SQLite file. Pass --database-url to
+use a scratch PostgreSQL database instead. Either way the tables are
+dropped and recreated for every scale, so never point it at real data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+ENDPOINTS = [
+    ("GET", "/portfolio/analysis"),
+    ("GET", "/portfolio/composition"),
+    ("GET", "/portfolio/performance"),
+    ("GET", "/portfolio/behavior"),
+    ("GET", "/orders"),
+    ("POST", "/import"),
+]
+
+SECTORS = ["IT", "Bank", "Energy", "Pharma", "Auto", "FMCG", "Metals", None]
+
+
+def configure_environment(args, workdir):
+    """Point the app at the scratch database and the offline fixture before it is imported."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ["MARKET_DATA_PROVIDER"] = "fixture"
+    os.environ["MARKET_DATA_FIXTURE"] = os.path.join(workdir, "market_data.sqlite3")
+    os.environ["QUOTE_REFRESH_ENABLED"] = "false"
+    os.environ.setdefault("JWT_SECRET_KEY", "load-test-secret")
+    os.environ.setdefault("GROQ_API_KEY", "unused")
+
+
+def symbol_universe(count):
+    return [f"LT{i:04d}.NS" for i in range(count)]
+
+
+def write_market_fixture(path, symbols, seed):
+    from app.providers import write_fixture
+
+    rng = random.Random(seed)
+    quotes = {}
+    reference = {}
+    for symbol in symbols:
+        price = rng.uniform(50, 5000)
+        quotes[symbol] = {"price": price, "open": price * rng.uniform(0.97, 1.03), "previous_close": price * rng.uniform(0.97, 1.03)}
+        reference[symbol] = {"sector": rng.choice(SECTORS), "market_cap": rng.choice([None, rng.uniform(1e10, 2e13)])}
+    write_fixture(path, quotes=quotes, reference=reference)
+
+
+def seed(engine, session_factory, total_orders, users, symbols, seed_value, batch=50_000):
+    """Insert `users` users with `total_orders` orders between them, then build their position snapshots."""
+    from app.database import Base
+    from app.models import User, Order
+    from app import snapshots
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed_value)
+    user_ids = [uuid.uuid4() for _ in range(users)]
+    start = datetime(2018, 1, 1, 9, 15)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": user_id, "email": f"load{i}@example.com", "hashed_password": "x", "created_at": datetime.utcnow()}
+            for i, user_id in enumerate(user_ids)
+        ])
+        for offset in range(0, total_orders, batch):
+            conn.execute(Order.__table__.insert(), [
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": user_ids[i % users],
+                    "symbol": rng.choice(symbols),
+                    "quantity": float(rng.randint(1, 50)),
+                    "price": round(rng.uniform(50, 5000), 2),
+                    "date": start + timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 7)),
+                    "type": "buy" if rng.random() < 0.65 else "sell",
+                }
+                for i in range(offset, min(offset + batch, total_orders))
+            ])
+
+    db = session_factory()
+    try:
+        for user_id in user_ids:
+            held = [s for (s,) in db.query(Order.symbol).filter(Order.user_id == user_id).distinct()]
+            snapshots.rebuild_symbols(db, user_id, held)
+            db.commit()
+    finally:
+        db.close()
+    return user_ids
+
+
+def import_payload(symbols, rows, rng):
+    lines = ["Symbol,Type,Qty,Price,Execution time"]
+    base = datetime(2024, 1, 1, 9, 15)
+    for _ in range(rows):
+        when = base + timedelta(seconds=rng.randint(0, 10**8))
+        lines.append(f"{rng.choice(symbols)},{rng.choice(['BUY', 'SELL'])},{rng.randint(1, 20)},{rng.uniform(50, 5000):.2f},{when:%Y-%m-%d %H:%M:%S}")
+    return "\n".join(lines).encode()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def wait_for_job(client, headers, job_id, poll_interval=0.02):
+    """Poll an import job until it is done or failed; returns its final status."""
+    while True:
+        job = (await client.get(f"/import/jobs/{job_id}", headers=headers)).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        await asyncio.sleep(poll_interval)
+
+
+async def run_endpoint(client, method, path, tokens, requests, concurrency, symbols, import_rows, rng):
+    latencies = []
+    failures = 0
+    rows = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(rng.choice(tokens))
+
+    async def worker():
+        nonlocal failures, rows
+        while True:
+            try:
+                token = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = {"Authorization": f"Bearer {token}"}
+            kwargs = {}
+            if method == "POST":
+                kwargs["files"] = {"file": ("trades.csv", import_payload(symbols, import_rows, rng), "text/csv")}
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers, **kwargs)
+            failed = response.status_code >= 400
+            if method == "POST" and not failed:
+                job = await wait_for_job(client, headers, response.json()["job_id"])
+                failed = job["status"] == "failed"
+                rows += job["processed"]
+            latencies.append((time.perf_counter() - started) * 1000)
+            if failed:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "failures": failures,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+    if method == "POST":
+        result["rows_per_s"] = round(rows / elapsed, 1)
+    return result
+
+
+async def run_scale(app, tokens, args, symbols, rng):
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        for method, path in ENDPOINTS:
+            # Warm-up: caches (quotes, reference data) fill on the first requests
+            await run_endpoint(client, method, path, tokens, min(args.concurrency, args.requests), args.concurrency, symbols, args.import_rows, rng)
+            results[f"{method} {path}"] = await run_endpoint(
+                client, method, path, tokens, args.requests, args.concurrency, symbols, args.import_rows, rng
+            )
+    return results
+
+
+def print_results(scale, users, results):
+    print(f"\n{scale} orders across {users} users")
+    print(f"{'endpoint':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<28} {r['throughput_rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['failures']:>7}")
+        if "rows_per_s" in r:
+            print(f"{'':<28} {r['rows_per_s']} rows/s imported, end to end")
+
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for endpoints whose p95 grew beyond the tolerance."""
+    regressions = []
+    for scale, endpoints in results.items():
+        for name, r in endpoints.items():
+            base = baseline.get(scale, {}).get(name)
+            if not base:
+                continue
+            limit = base["p95_ms"] * (1 + tolerance)
+            change = (r["p95_ms"] / base["p95_ms"] - 1) * 100 if base["p95_ms"] else 0
+            status = "REGRESSION" if r["p95_ms"] > limit else "ok"
+            print(f"{scale:>8} {name:<28} p95 {base['p95_ms']:>9} -> {r['p95_ms']:>9} ms ({change:+.0f}%) {status}")
+            if r["p95_ms"] > limit:
+                regressions.append(f"{scale} {name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 10_000, 1_000_000], help="total orders per run")
+    parser.add_argument("--orders-per-user", type=int, default=1000, help="users = ceil(scale / orders-per-user)")
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--import-rows", type=int, default=100, help="rows per /import upload")
+    parser.add_argument("--database-url", help="scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--baseline", help="compare against a results JSON from an earlier run")
+    parser.add_argument("--save-baseline", help="write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 growth over baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="portfolio-loadtest-")
+    configure_environment(args, workdir)
+
+    from app.database import engine, SessionLocal
+    from app.auth import create_access_token
+    from app.main import app
+
+    symbols = symbol_universe(args.symbols)
+    write_market_fixture(os.environ["MARKET_DATA_FIXTURE"], symbols, args.seed)
+
+    results = {}
+    for scale in args.scales:
+        users = max(1, -(-scale // args.orders_per_user))
+        started = time.perf_counter()
+        user_ids = seed(engine, SessionLocal, scale, users, symbols, args.seed)
+        print(f"\nseeded {scale} orders for {users} users in {time.perf_counter() - started:.1f}s")
+        tokens = [create_access_token({"sub": str(user_id)}, expires_delta=timedelta(days=1)) for user_id in user_ids]
+        results[str(scale)] = asyncio.run(run_scale(app, tokens, args, symbols, random.Random(args.seed)))
+        print_results(scale, users, results[str(scale)])
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            print(f"\nwrote {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncomparison with {args.baseline} (tolerance {args.tolerance:.0%})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""instrument reference data, position snapshots, import jobs and order fingerprints
+
+Databases created by create_tables.py between the baseline and this
+migration may already have some of these tables or the fingerprint column;
+only what is missing is created, so stamping them at 0001_baseline and
+upgrading never touches existing data.
+
+Revision ID: 0002_caches_and_import_jobs
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_caches_and_import_jobs"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "instruments" not in tables:
+        _create_instruments()
+    if "position_snapshots" not in tables:
+        _create_position_snapshots()
+    if "import_jobs" not in tables:
+        _create_import_jobs()
+
+    order_columns = {column["name"] for column in inspector.get_columns("orders")}
+    order_uniques = {constraint["name"] for constraint in inspector.get_unique_constraints("orders")}
+    if "fingerprint" not in order_columns or "uq_orders_user_fingerprint" not in order_uniques:
+        with op.batch_alter_table("orders") as batch:
+            if "fingerprint" not in order_columns:
+                batch.add_column(sa.Column("fingerprint", sa.String(), nullable=True))
+            if "uq_orders_user_fingerprint" not in order_uniques:
+                batch.create_unique_constraint("uq_orders_user_fingerprint", ["user_id", "fingerprint"])
+
+
+def _create_instruments():
+    op.create_table(
+        "instruments",
+        sa.Column("symbol", sa.String(), primary_key=True),
+        sa.Column("sector", sa.String(), nullable=True),
+        sa.Column("market_cap", sa.Float(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_instruments_symbol", "instruments", ["symbol"], unique=False)
+
+
+def _create_position_snapshots():
+    op.create_table(
+        "position_snapshots",
+        sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("symbol", sa.String(), primary_key=True),
+        sa.Column("quantity", sa.Float(), nullable=False),
+        sa.Column("investment", sa.Float(), nullable=False),
+        sa.Column("realized_profit", sa.Float(), nullable=False),
+        sa.Column("buy_lots", sa.JSON(), nullable=False),
+        sa.Column("last_order_date", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def _create_import_jobs():
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.Uuid(), primary_key=True),
+        sa.Column("user_id", sa.Uuid(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("imported", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("duplicates", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.JSON(), nullable=False),
+        sa.Column("detail", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_import_jobs_id", "import_jobs", ["id"], unique=True)
+    op.create_index("ix_import_jobs_user_id", "import_jobs", ["user_id"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_constraint("uq_orders_user_fingerprint", type_="unique")
+        batch.drop_column("fingerprint")
+    op.drop_table("import_jobs")
+    op.drop_table("position_snapshots")
+    op.drop_table("instruments")
@@ -0,0 +1,26 @@
+"""composite (user_id, date) and (user_id, symbol, date) indexes on orders
+
+Analysis endpoints filter orders by user and sort by date; snapshot rebuilds
+additionally filter by symbol. Without these PostgreSQL scans and sorts the
+table per request.
+
+Revision ID: 0003_order_composite_indexes
+Revises: 0002_caches_and_import_jobs
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003_order_composite_indexes"
+down_revision = "0002_caches_and_import_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_orders_user_id_date", "orders", ["user_id", "date"], unique=False)
+    op.create_index("ix_orders_user_id_symbol_date", "orders", ["user_id", "symbol", "date"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_orders_user_id_symbol_date", table_name="orders")
+    op.drop_index("ix_orders_user_id_date", table_name="orders")
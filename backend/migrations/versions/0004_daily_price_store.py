@@ -0,0 +1,39 @@
+"""daily OHLC price store and fetched-range bookkeeping for /portfolio/history
+
+Revision ID: 0004_daily_price_store
+Revises: 0003_order_composite_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_daily_price_store"
+down_revision = "0003_order_composite_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_prices",
+        sa.Column("symbol", sa.String(), primary_key=True),
+        sa.Column("date", sa.Date(), primary_key=True),
+        sa.Column("open", sa.Float(), nullable=True),
+        sa.Column("high", sa.Float(), nullable=True),
+        sa.Column("low", sa.Float(), nullable=True),
+        sa.Column("close", sa.Float(), nullable=True),
+        sa.Column("volume", sa.Float(), nullable=True),
+    )
+
+    op.create_table(
+        "price_history_ranges",
+        sa.Column("symbol", sa.String(), primary_key=True),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("price_history_ranges")
+    op.drop_table("daily_prices")
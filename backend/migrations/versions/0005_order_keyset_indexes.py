@@ -0,0 +1,32 @@
+"""extend the orders (user_id, date) indexes with id for keyset pagination
+
+GET /orders pages newest first on (date, id), optionally for one symbol.
+With id in the index PostgreSQL seeks straight to the cursor and reads the
+page in index order, with no sort of the user's remaining orders. The new
+indexes cover everything the (user_id, date) and (user_id, symbol, date)
+indexes served, so those are dropped.
+
+Revision ID: 0005_order_keyset_indexes
+Revises: 0004_daily_price_store
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005_order_keyset_indexes"
+down_revision = "0004_daily_price_store"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_orders_user_id_date_id", "orders", ["user_id", "date", "id"], unique=False)
+    op.create_index("ix_orders_user_id_symbol_date_id", "orders", ["user_id", "symbol", "date", "id"], unique=False)
+    op.drop_index("ix_orders_user_id_symbol_date", table_name="orders")
+    op.drop_index("ix_orders_user_id_date", table_name="orders")
+
+
+def downgrade():
+    op.create_index("ix_orders_user_id_date", "orders", ["user_id", "date"], unique=False)
+    op.create_index("ix_orders_user_id_symbol_date", "orders", ["user_id", "symbol", "date"], unique=False)
+    op.drop_index("ix_orders_user_id_symbol_date_id", table_name="orders")
+    op.drop_index("ix_orders_user_id_date_id", table_name="orders")
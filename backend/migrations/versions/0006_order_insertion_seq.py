@@ -0,0 +1,27 @@
+"""orders.seq: insertion order, the FIFO tie-break between same-timestamp orders
+
+Orders were replayed by date alone, so a buy and a sell with the same
+timestamp could be matched in either order. Rows that exist before this
+migration get seq 0 and fall back to id order among themselves; new rows
+get an increasing stamp from the application.
+
+Revision ID: 0006_order_insertion_seq
+Revises: 0005_order_keyset_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_order_insertion_seq"
+down_revision = "0005_order_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("orders", sa.Column("seq", sa.BigInteger(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("orders") as batch:
+        batch.drop_column("seq")
@@ -0,0 +1,28 @@
+"""import_jobs.owner and heartbeat_at: which process runs a job, and when it last checked in
+
+The startup sweep used to fail every unfinished job, including jobs that
+another app server was still running. Jobs now record their owner process
+and a heartbeat, and only jobs whose heartbeat went stale are failed.
+
+Revision ID: 0007_import_job_heartbeats
+Revises: 0006_order_insertion_seq
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_import_job_heartbeats"
+down_revision = "0006_order_insertion_seq"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("import_jobs", sa.Column("owner", sa.String(), nullable=True))
+    op.add_column("import_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("import_jobs") as batch:
+        batch.drop_column("heartbeat_at")
+        batch.drop_column("owner")
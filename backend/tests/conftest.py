@@ -0,0 +1,68 @@
+"""Shared fixtures: the app runs against a throwaway SQLite database.
+
+The environment is set before anything under app/ is imported, because
+app.config reads it at import time.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_workdir = tempfile.mkdtemp(prefix="portfolio-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["ASYNC_DATABASE_URL"] = "off"
+os.environ["QUOTE_REFRESH_ENABLED"] = "false"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("GROQ_API_KEY", "unused")
+
+from app.database import Base, engine, SessionLocal  # noqa: E402
+from app import models  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user of their own for each call; tests never share order history."""
+    def make():
+        user = models.User(id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def user(make_user):
+    return make_user()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers():
+    from app.auth import create_access_token
+
+    def headers(user):
+        return {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+    return headers
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from app import analytics
+from app.providers import QUOTE_COLUMNS
+
+
+def test_value_holdings_loop_and_column_paths_agree(monkeypatch):
+    holdings = {
+        "AAA": {"quantity": 10.0, "avg_buy_price": 100.0},
+        "BBB": {"quantity": 5.0, "avg_buy_price": 40.0},  # no previous close: change from the open
+        "CCC": {"quantity": 2.0, "avg_buy_price": 10.0},  # no quote at all
+        "DDD": {"quantity": 0.0, "avg_buy_price": 0.0},  # closed
+    }
+    quotes = pd.DataFrame(
+        [[110.0, 105.0, 100.0], [50.0, 40.0, float("nan")]],
+        index=pd.Index(["AAA", "BBB"], name="symbol"),
+        columns=QUOTE_COLUMNS,
+    )
+    frame = analytics.holdings_frame(holdings)
+    looped = analytics.value_holdings(frame, quotes)
+    monkeypatch.setattr(analytics, "VALUE_LOOP_MAX_HOLDINGS", 0)
+    vectorized = analytics.value_holdings(frame, quotes)
+
+    pd.testing.assert_frame_equal(looped, vectorized)
+    assert list(looped.index) == ["AAA", "BBB", "CCC"]
+    assert looped.loc["AAA", "day_change_percent"] == 10.0
+    assert looped.loc["BBB", "day_change_percent"] == 25.0
+    assert looped.loc["CCC", "current_value"] == 0.0
+    assert abs(looped["allocation_percent"].sum() - 100) < 1e-9
@@ -0,0 +1,45 @@
+import io
+
+from app import broker_import
+from app.models import Order
+
+HEADER = "Symbol,Type,Qty,Price,Execution time\n"
+
+
+def _import(db, user, rows):
+    return broker_import.import_orders(db, user.id, io.BytesIO((HEADER + rows).encode()), "trades.csv")
+
+
+def test_reimporting_a_file_skips_every_trade(db, user):
+    rows = "AAA,BUY,2,200,2024-01-02 10:00:00\nAAA,SELL,1,150,2024-01-03 11:00:00\n"
+    assert _import(db, user, rows)["imported"] == 2
+    again = _import(db, user, rows)
+    assert again["imported"] == 0
+    assert again["duplicates"] == 2
+
+
+def test_identical_fills_in_one_upload_are_all_kept(db, user):
+    rows = "AAA,BUY,1,100,2024-01-02 10:00:00\n" * 3
+    assert _import(db, user, rows)["imported"] == 3
+    assert _import(db, user, rows + "AAA,BUY,1,100,2024-01-02 10:00:00\n")["imported"] == 1
+
+
+def test_identical_fills_split_across_chunks_keep_their_occurrence(db, user, monkeypatch):
+    monkeypatch.setattr(broker_import, "IMPORT_CHUNK_SIZE", 2)
+    rows = "AAA,BUY,1,100,2024-01-02 10:00:00\n" * 5
+    assert _import(db, user, rows)["imported"] == 5
+    assert _import(db, user, rows)["duplicates"] == 5
+
+
+def test_execution_time_is_part_of_the_fingerprint(db, user):
+    _import(db, user, "AAA,BUY,1,100,2024-01-02 10:00:00\n")
+    assert _import(db, user, "AAA,BUY,1,100,2024-01-02 10:00:01\n")["imported"] == 1
+
+
+def test_trades_without_execution_time_are_never_deduplicated(db, user):
+    rows = "AAA,BUY,1,100,\n"
+    assert _import(db, user, rows)["imported"] == 1
+    # Stamped with the import time, so a repeat is indistinguishable from a new trade: keep it
+    assert _import(db, user, rows)["imported"] == 1
+    fingerprints = [f for (f,) in db.query(Order.fingerprint).filter(Order.user_id == user.id)]
+    assert fingerprints == [None, None]
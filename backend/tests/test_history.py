@@ -0,0 +1,54 @@
+import pandas as pd
+
+from app.history import build_history, daily_holdings
+
+
+def _orders(*rows):
+    return pd.DataFrame(
+        [(i, symbol, quantity, price, pd.Timestamp(day), type_) for i, (symbol, type_, quantity, price, day) in enumerate(rows)],
+        columns=["id", "symbol", "quantity", "price", "date", "type"],
+    )
+
+
+def test_sell_then_rebuy_history():
+    orders = _orders(
+        ("AAA", "buy", 10, 100, "2024-01-01"),
+        ("AAA", "sell", 10, 120, "2024-01-02"),
+        ("AAA", "buy", 5, 110, "2024-01-03 15:30"),
+    )
+    closes = pd.DataFrame({"AAA": [100.0, 120.0, 110.0, 130.0]}, index=pd.date_range("2024-01-01", periods=4, freq="D"))
+    history = build_history(orders, closes)
+
+    assert history[:4] == [
+        {"date": "2024-01-01", "value": 1000.0, "invested": 1000.0, "profit_loss": 0.0},
+        {"date": "2024-01-02", "value": 0.0, "invested": -200.0, "profit_loss": 200.0},
+        {"date": "2024-01-03", "value": 550.0, "invested": 350.0, "profit_loss": 200.0},
+        {"date": "2024-01-04", "value": 650.0, "invested": 350.0, "profit_loss": 300.0},
+    ]
+    # Runs to today at the last close
+    assert history[-1]["date"] == pd.Timestamp.today().strftime("%Y-%m-%d")
+    assert history[-1]["value"] == 650.0
+    assert [row["date"] for row in build_history(orders, closes, start="2024-01-03")][:2] == ["2024-01-03", "2024-01-04"]
+
+
+def test_daily_holdings_price_days_before_the_first_close_at_the_trade_price():
+    orders = _orders(("AAA", "buy", 2, 50, "2024-01-01"), ("BBB", "buy", 1, 10, "2024-01-02"))
+    closes = pd.DataFrame({"AAA": [55.0], "BBB": [12.0]}, index=pd.DatetimeIndex(["2024-01-03"]))
+    calendar, quantities, prices, invested = daily_holdings(orders, closes, end="2024-01-03")
+
+    assert list(calendar.strftime("%Y-%m-%d")) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert quantities.to_dict("list") == {"AAA": [2.0, 2.0, 2.0], "BBB": [0.0, 1.0, 1.0]}
+    assert prices["AAA"].tolist() == [50.0, 50.0, 55.0]
+    assert prices["BBB"].tolist()[1:] == [10.0, 12.0]
+    assert invested.tolist() == [100.0, 110.0, 110.0]
+
+
+def test_daily_holdings_drop_oversold_quantity():
+    orders = _orders(("AAA", "buy", 10, 100, "2024-01-01"), ("AAA", "sell", 15, 120, "2024-01-02"))
+    _, quantities, _, invested = daily_holdings(orders, pd.DataFrame({"AAA": [100.0, 120.0]}, index=pd.date_range("2024-01-01", periods=2, freq="D")), end="2024-01-02")
+    assert quantities["AAA"].tolist() == [10.0, 0.0]
+    assert invested.tolist() == [1000.0, -200.0]
+
+
+def test_no_orders_no_history():
+    assert build_history(_orders(), pd.DataFrame()) == []
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from app import broker_import
+from app.models import ImportJob, Order
+from app.snapshots import get_positions
+
+
+def _upload(text):
+    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".csv") as f:
+        f.write(text)
+    return f.name
+
+
+def _queue(db, user, owner=None, heartbeat_at=None):
+    job = ImportJob(id=uuid.uuid4(), user_id=user.id, filename="trades.csv", status="queued", owner=owner, heartbeat_at=heartbeat_at)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def test_job_lists_at_most_import_max_errors(db, user, monkeypatch):
+    monkeypatch.setattr(broker_import, "IMPORT_MAX_ERRORS", 3)
+    rows = "".join(f"AAA,HOLD,1,10,2024-01-0{1 + i} 10:00:00\n" for i in range(8))
+    job = _queue(db, user)
+    broker_import.run_import_job(job.id, _upload("Symbol,Type,Qty,Price,Execution time\n" + rows + "AAA,BUY,1,10,2024-02-01 10:00:00\n"), "trades.csv")
+
+    db.refresh(job)
+    assert job.status == "done"
+    assert job.skipped == 8
+    assert [e["row"] for e in job.errors] == [2, 3, 4]
+    assert job.imported == 1
+
+
+def test_missing_job_row_does_not_crash_the_worker(db):
+    path = _upload("Symbol,Type,Qty,Price,Execution time\n")
+    broker_import.run_import_job(uuid.uuid4(), path, "trades.csv")
+    assert not os.path.exists(path)
+
+
+def test_sweep_fails_only_jobs_whose_owner_stopped_heartbeating(db, user):
+    db.add(Order(id=uuid.uuid4(), user_id=user.id, symbol="AAA.NS", type="buy", quantity=2, price=10, date=datetime(2024, 1, 1)))
+    now = datetime.utcnow()
+    legacy = _queue(db, user)
+    abandoned = _queue(db, user, owner="gone:1:x", heartbeat_at=now - timedelta(seconds=broker_import.IMPORT_STALE_SECONDS + 60))
+    elsewhere = _queue(db, user, owner="other:2:y", heartbeat_at=now)
+    finished = _queue(db, user)
+    finished.status = "done"
+    db.commit()
+
+    assert broker_import.fail_interrupted_jobs() >= 2
+
+    for job in (legacy, abandoned, elsewhere, finished):
+        db.refresh(job)
+    assert legacy.status == "failed" and abandoned.status == "failed" and abandoned.finished_at is not None
+    assert elsewhere.status == "queued"
+    assert finished.status == "done"
+    # Orders from chunks committed before the owner died show up in the snapshot
+    assert get_positions(db, user.id)["holdings"]["AAA.NS"]["quantity"] == 2
+
+
+def test_heartbeat_keeps_this_processes_jobs_alive(db, user):
+    mine = _queue(db, user, owner=broker_import.WORKER_ID, heartbeat_at=datetime.utcnow() - timedelta(days=1))
+
+    broker_import.heartbeat_jobs()
+
+    db.refresh(mine)
+    assert mine.status == "queued"
+    assert mine.heartbeat_at > datetime.utcnow() - timedelta(seconds=broker_import.IMPORT_STALE_SECONDS)
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.market_data import QuoteCache
+from app.providers import StubProvider, YFinanceProvider
+
+
+class SlowProvider(StubProvider):
+    """Holds the first async fetch until released, so a second caller joins it in flight."""
+
+    def __init__(self, quotes):
+        super().__init__(quotes)
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def fetch_quotes_async(self, symbols):
+        self.calls += 1
+        if self.calls == 1:
+            self.started.set()
+            await self.release.wait()
+        return self.fetch_quotes(symbols)
+
+
+class FailingProvider(StubProvider):
+    def fetch_quotes(self, symbols):
+        self.calls += 1
+        raise RuntimeError("upstream down")
+
+
+def test_cancelled_owner_neither_caches_nor_strands_waiters():
+    async def scenario():
+        provider = SlowProvider({"AAA": 10.0})
+        cache = QuoteCache(provider, ttl=60)
+        owner = asyncio.create_task(cache.aget_many(["AAA"]))
+        await provider.started.wait()
+        waiter = asyncio.create_task(cache.aget_many(["AAA"]))
+        await asyncio.sleep(0)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        # The waiter fetched the quote itself instead of seeing the abandoned fetch as "no quote"
+        assert (await waiter)["AAA"]["price"] == 10.0
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.get("AAA")["price"] == 10.0
+
+
+def test_provider_errors_are_not_cached():
+    provider = FailingProvider({"AAA": 10.0})
+    cache = QuoteCache(provider, ttl=60)
+    assert cache.get_many(["AAA"]) == {"AAA": None}
+    assert cache.get_many(["AAA"]) == {"AAA": None}
+    assert provider.calls == 2
+
+
+def test_multi_symbol_downloads_stay_off_the_shared_threadpool(monkeypatch):
+    threads = []
+
+    def fetch_quotes(symbols):
+        threads.append(threading.current_thread().name)
+        return StubProvider({}).fetch_quotes(symbols)
+
+    provider = YFinanceProvider()
+    monkeypatch.setattr(provider, "fetch_quotes", fetch_quotes)
+    table = asyncio.run(provider.fetch_quotes_async(["AAA", "BBB"]))
+    assert list(table.index) == ["AAA", "BBB"]
+    assert threads[0].startswith("market-data")
@@ -0,0 +1,76 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Order
+
+
+@pytest.fixture
+def orders(db, user):
+    """25 orders over 10 dates, so most pages split a run of same-date orders."""
+    start = datetime(2024, 1, 1, 10, 0)
+    rows = [
+        Order(id=uuid.uuid4(), user_id=user.id, symbol="AAA.NS" if i % 3 else "BBB.NS", type="sell" if i % 4 == 0 else "buy",
+              quantity=1 + i, price=100, date=start + timedelta(days=i % 10))
+        for i in range(25)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return sorted(rows, key=lambda o: (o.date, o.id.hex), reverse=True)
+
+
+def _pages(client, headers, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get("/orders", headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+
+
+def test_cursor_pages_cover_every_order_once_newest_first(client, auth_headers, user, orders):
+    pages = _pages(client, auth_headers(user), limit=4)
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 4, 1]
+    assert [o["id"] for page in pages for o in page] == [str(o.id) for o in orders]
+
+
+def test_last_full_page_has_no_cursor(client, auth_headers, user, orders):
+    response = client.get("/orders", headers=auth_headers(user), params={"limit": 25})
+    assert len(response.json()) == 25
+    assert "x-next-cursor" not in response.headers
+
+
+def test_filters_apply_across_pages(client, auth_headers, user, orders):
+    pages = _pages(client, auth_headers(user), limit=3, symbol="AAA.NS", type="buy")
+    expected = [str(o.id) for o in orders if o.symbol == "AAA.NS" and o.type == "buy"]
+    assert [o["id"] for page in pages for o in page] == expected
+
+
+def test_cursor_round_trip():
+    from app.portfolio import _decode_cursor, _encode_cursor
+
+    order = Order(id=uuid.uuid4(), date=datetime(2024, 5, 6, 7, 8, 9, 123456))
+    assert _decode_cursor(_encode_cursor(order)) == (order.date, order.id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00").decode(),
+    base64.urlsafe_b64encode(b"yesterday|" + uuid.uuid4().hex.encode()).decode(),
+    base64.urlsafe_b64encode(b"2024-01-01T00:00:00|not-a-uuid").decode(),
+])
+def test_malformed_cursor_is_rejected(client, auth_headers, user, cursor):
+    response = client.get("/orders", headers=auth_headers(user), params={"cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_ndjson_export_streams_every_order(client, auth_headers, user, orders):
+    response = client.get("/orders", headers=auth_headers(user), params={"format": "ndjson", "limit": 2})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [str(o.id) for o in orders]
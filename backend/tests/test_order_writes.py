@@ -0,0 +1,127 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import snapshots
+from app.models import Order
+from app.order_queries import load_orders
+from app.positions import compute_positions
+
+
+def _order(db, user, symbol="AAA.NS", quantity=10, price=100, day=1, type_="buy"):
+    order = Order(id=uuid.uuid4(), user_id=user.id, symbol=symbol, type=type_, quantity=quantity, price=price, date=datetime(2024, 1, day))
+    db.add(order)
+    snapshots.record_new_order(db, order)
+    db.commit()
+    return order
+
+
+def _create(symbol="AAA.NS", quantity=1, price=100, day=2, type_="buy"):
+    return {"op": "create", "order": {"symbol": symbol, "quantity": quantity, "price": price, "date": f"2024-01-{day:02d}T00:00:00", "type": type_}}
+
+
+def _assert_snapshot_matches_orders(db, user):
+    db.expire_all()
+    replayed = compute_positions(load_orders(db, user.id))["holdings"]
+    stored = snapshots.get_positions(db, user.id)["holdings"]
+    assert {s: p["quantity"] for s, p in stored.items()} == {s: p["quantity"] for s, p in replayed.items()}
+
+
+@pytest.mark.parametrize("method", ["put", "delete"])
+def test_other_users_orders_look_missing(client, auth_headers, db, make_user, method):
+    owner, other = make_user(), make_user()
+    order = _order(db, owner)
+    if method == "put":
+        response = client.put(f"/orders/update/{order.id}", json={"quantity": 1}, headers=auth_headers(other))
+    else:
+        response = client.delete(f"/orders/delete/{order.id}", headers=auth_headers(other))
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Order not found"
+    db.expire_all()
+    assert db.get(Order, order.id).quantity == 10
+
+
+def test_batch_applies_creates_updates_and_deletes(client, auth_headers, db, user):
+    keep, drop_id = _order(db, user), _order(db, user, symbol="BBB.NS").id
+    response = client.post("/orders/batch", headers=auth_headers(user), json={"operations": [
+        _create(quantity=3), _create(symbol="CCC.NS", quantity=4),
+        {"op": "update", "id": str(keep.id), "changes": {"quantity": 7}},
+        {"op": "delete", "id": str(drop_id)},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["applied"] == 4
+    assert all(r["status"] == "ok" for r in body["results"])
+
+    db.expire_all()
+    assert db.get(Order, keep.id).quantity == 7
+    assert db.get(Order, drop_id) is None
+    created = [db.get(Order, uuid.UUID(r["id"])) for r in body["results"][:2]]
+    assert [o.quantity for o in created] == [3, 4]
+    # Bulk creates still get increasing insertion stamps for the FIFO tie-break
+    assert 0 < created[0].seq < created[1].seq
+    _assert_snapshot_matches_orders(db, user)
+
+
+def test_atomic_batch_with_an_error_applies_nothing(client, auth_headers, db, user):
+    order = _order(db, user)
+    response = client.post("/orders/batch", headers=auth_headers(user), json={"atomic": True, "operations": [
+        _create(),
+        {"op": "update", "id": str(order.id), "changes": {"quantity": 1}},
+        {"op": "delete", "id": str(uuid.uuid4())},
+    ]})
+    assert response.status_code == 409
+    body = response.json()
+    assert body["applied"] == 0
+    assert [r["detail"] for r in body["results"]] == ["Not applied", "Not applied", "Order not found"]
+    db.expire_all()
+    assert [o.quantity for o in load_orders(db, user.id)] == [10]
+
+
+def test_non_atomic_batch_applies_the_valid_operations(client, auth_headers, db, user):
+    order = _order(db, user)
+    response = client.post("/orders/batch", headers=auth_headers(user), json={"operations": [
+        {"op": "delete", "id": str(uuid.uuid4())},
+        {"op": "update", "id": str(order.id), "changes": {"quantity": 2}},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["applied"] == 1
+    db.expire_all()
+    assert db.get(Order, order.id).quantity == 2
+    _assert_snapshot_matches_orders(db, user)
+
+
+def test_an_order_may_appear_only_once_per_batch(client, auth_headers, db, user):
+    order = _order(db, user)
+    response = client.post("/orders/batch", headers=auth_headers(user), json={"operations": [
+        {"op": "update", "id": str(order.id), "changes": {"quantity": 2}},
+        {"op": "delete", "id": str(order.id)},
+    ]})
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["ok", "error"]
+    assert results[1]["detail"] == "Order appears more than once in the batch"
+    db.expire_all()
+    assert db.get(Order, order.id).quantity == 2
+
+
+def test_batch_cannot_touch_other_users_orders(client, auth_headers, db, make_user):
+    owner, other = make_user(), make_user()
+    order = _order(db, owner)
+    response = client.post("/orders/batch", headers=auth_headers(other), json={"operations": [
+        {"op": "update", "id": str(order.id), "changes": {"quantity": 1}},
+        {"op": "delete", "id": str(order.id)},
+    ]})
+    assert response.json()["applied"] == 0
+    assert {r["detail"] for r in response.json()["results"]} == {"Order not found"}
+    db.expire_all()
+    assert db.get(Order, order.id).quantity == 10
+    _assert_snapshot_matches_orders(db, owner)
+
+
+def test_offset_dates_are_stored_as_naive_utc(client, auth_headers, db, user):
+    for date in ["2024-01-02T00:00:00Z", "2024-01-03T05:30:00+05:30"]:
+        response = client.post("/orders/add", json={"symbol": "AAA.NS", "quantity": 1, "price": 100, "date": date, "type": "buy"}, headers=auth_headers(user))
+        assert response.status_code == 200
+    assert [o.date for o in load_orders(db, user.id)] == [datetime(2024, 1, 2), datetime(2024, 1, 3)]
+    _assert_snapshot_matches_orders(db, user)
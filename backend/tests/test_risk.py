@@ -0,0 +1,60 @@
+import math
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from app.risk import build_risk, daily_returns, xirr
+
+
+def _orders(*rows):
+    return pd.DataFrame(
+        [(i, symbol, quantity, price, pd.Timestamp(day), type_) for i, (symbol, type_, quantity, price, day) in enumerate(rows)],
+        columns=["id", "symbol", "quantity", "price", "date", "type"],
+    )
+
+
+def _closes(prices, start="2024-01-01"):
+    return pd.DataFrame(prices, index=pd.date_range(start, periods=len(next(iter(prices.values()))), freq="D"))
+
+
+def test_xirr_of_ten_percent_a_year():
+    assert xirr([-1000, 1100], pd.DatetimeIndex(["2023-01-02", "2024-01-02"])) == pytest.approx(0.10, abs=1e-9)
+    assert xirr([-1000, 1210], pd.DatetimeIndex(["2022-01-01", "2024-01-01"])) == pytest.approx(0.10, abs=1e-9)
+
+
+def test_xirr_is_undefined_without_money_in_and_out():
+    assert xirr([1000, 1100], pd.DatetimeIndex(["2023-01-02", "2024-01-02"])) is None
+
+
+def test_daily_returns_ignore_buys_and_sells():
+    index = pd.date_range("2024-01-01", periods=3, freq="D")
+    prices = pd.DataFrame({"AAA": [100.0, 110.0, 99.0]}, index=index)
+    # Doubling the position on day two is not a return
+    quantities = pd.DataFrame({"AAA": [10.0, 20.0, 20.0]}, index=index)
+    returns = daily_returns(quantities, prices, index)
+    assert returns.tolist() == pytest.approx([0.10, -0.10])
+    assert daily_returns(quantities, prices, index[-1:]).tolist() == pytest.approx([-0.10])
+
+
+def test_build_risk_known_answers():
+    orders = _orders(("AAA", "buy", 10, 100, "2024-01-01"))
+    closes = _closes({"AAA": [100.0, 110.0, 99.0, 108.9]})
+    risk = build_risk(orders, closes, benchmark=closes["AAA"])
+
+    assert risk["trading_days"] == 3
+    assert risk["max_drawdown"] == -10.0
+    assert risk["beta"] == 1.0
+    # 1000 in on the first day, 1089 of holdings out today (the calendar runs to today at the last close)
+    days = (date.today() - date(2024, 1, 1)).days
+    assert risk["xirr"] == pytest.approx(round((1089 / 1000) ** (365 / days) * 100 - 100, 2), abs=0.01)
+    returns = [0.10, -0.10, 0.10]
+    assert risk["annualized_return"] == round((1.1 * 0.9 * 1.1) ** (252 / 3) * 100 - 100, 2)
+    volatility = pd.Series(returns).std() * math.sqrt(252)
+    assert risk["annualized_volatility"] == round(volatility * 100, 2)
+
+
+def test_build_risk_with_no_orders():
+    risk = build_risk(_orders(), pd.DataFrame())
+    assert risk["xirr"] is None and risk["trading_days"] == 0
+
@@ -26,14 +26,26 @@ const ImportPage = () => {
     formData.append('file', file);
     try {
       const token = localStorage.getItem('token');
-      await axios.post('/import', formData, {
+      const res = await axios.post('/import', formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
           Authorization: `Bearer ${token}`,
         },
       });
-      setSuccess('File imported successfully!');
-      setFile(null);
+      // Imports run as background jobs; poll until this one finishes
+      let job = res.data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = (await axios.get(`/import/jobs/${job.job_id}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        })).data;
+      }
+      if (job.status === 'failed') {
+        setError(job.detail || 'Failed to import file.');
+      } else {
+        setSuccess(`File imported successfully! ${job.imported} imported, ${job.skipped} skipped.`);
+        setFile(null);
+      }
     } catch (err) {
       setError('Failed to import file.');
     } finally {
@@ -5,6 +5,8 @@ const Orders = () => {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [editingOrder, setEditingOrder] = useState(null);
   const [form, setForm] = useState({ symbol: '', type: 'buy', quantity: '', price: '', date: '' });
@@ -13,14 +15,21 @@ const Orders = () => {
     fetchOrders();
   }, []);
 
+  // /orders is paged newest first; X-Next-Cursor points at the next page, if there is one
+  const fetchPage = (cursor) => {
+    const token = localStorage.getItem('token');
+    return axios.get('/orders', {
+      headers: { Authorization: `Bearer ${token}` },
+      params: cursor ? { cursor } : {},
+    });
+  };
+
   const fetchOrders = async () => {
     try {
       setLoading(true);
-      const token = localStorage.getItem('token');
-      const response = await axios.get('/orders', {
-        headers: { Authorization: `Bearer ${token}` },
-      });
+      const response = await fetchPage(null);
       setOrders(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (err) {
       setError('Failed to fetch orders');
     } finally {
@@ -28,6 +37,19 @@ const Orders = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await fetchPage(nextCursor);
+      setOrders((prev) => prev.concat(response.data));
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err) {
+      alert('Failed to load more orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (id) => {
     if (!window.confirm('Are you sure you want to delete this order?')) return;
     try {
@@ -49,6 +71,7 @@ const Orders = () => {
         headers: { Authorization: `Bearer ${token}` },
       });
       setOrders([]);
+      setNextCursor(null);
     } catch (err) {
       alert('Failed to delete all orders');
     }
@@ -224,6 +247,17 @@ const Orders = () => {
           <div className="text-center text-gray-400 py-6">No orders found.</div>
         )}
       </div>
+      {nextCursor && (
+        <div className="flex justify-center mt-6">
+          <button
+            className="bg-gray-700 hover:bg-gray-600 text-white font-semibold py-2 px-6 rounded shadow disabled:opacity-50"
+            onClick={handleLoadMore}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
       {/* Modal Form */}
       {showForm && (
         <div className="fixed inset-0 z-50 flex items-center justify-center bg-black bg-opacity-60">